@@ -7,13 +7,108 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     
     DATABASE_URL: str = "sqlite:///./printbot.db"
+    # SQLite profile for flash storage (WAL, pragmas, pooled connections, idle checkpoints)
+    DB_SQLITE_PROFILE: bool = True
+    DB_SYNCHRONOUS: str = "NORMAL"
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_CACHE_SIZE_KB: int = 8192
+    DB_MMAP_MB: int = 64
+    DB_POOL_SIZE: int = 8
+    DB_MAX_OVERFLOW: int = 16
+    DB_CHECKPOINT_INTERVAL: float = 30.0
+    DB_CHECKPOINT_IDLE_SECONDS: float = 20.0
     
     RAZORPAY_KEY_ID: str = ""
     RAZORPAY_KEY_SECRET: str = ""
     RAZORPAY_CURRENCY: str = "INR"
     
     PRINTER_NAME: str = "Canon_LBP122dw"
+    # Multi-printer pool: "name[:pages_per_minute], ..." (empty = just PRINTER_NAME)
+    PRINTER_POOL: str = ""
+    PRINTER_POOL_REFRESH_INTERVAL: float = 10.0
+    # Seconds between CUPS job-state polls for jobs that are printing
+    CUPS_POLL_INTERVAL: float = 3.0
+    # Let CUPS select pages (IPP page-ranges) on printers that support it instead of rewriting the PDF
+    CUPS_NATIVE_PAGE_RANGES: bool = True
+
+    # Pre-spool PDF optimization: downsample images, grayscale for mono pools, compact
+    PDF_OPTIMIZE_ENABLED: bool = False
+    PDF_OPTIMIZE_DPI: int = 0 # 0 = printer's reported native resolution, else 600
+    PDF_OPTIMIZE_GRAYSCALE: bool = True # only applied when every pool printer is mono
+
+    # Photo uploads (JPEG/PNG): decode resolution, page margin, parallel decoders (0 = one per core)
+    IMAGE_DPI: int = 300
+    IMAGE_MARGIN_MM: float = 5.0
+    IMAGE_WORKERS: int = 0
+
+    # Per-page analysis (size, blank, ink, colour) runs in this many worker processes
+    PAGE_INDEX_WORKERS: int = 1
+
+    # Plain text is laid out in-process (monospace A4) at this size
+    TEXT_FONT_SIZE: float = 10.0
+
+    # Large documents: stream selections above LARGE_DOC_MIN_PAGES to CUPS in chunks (0 disables)
+    LARGE_DOC_MIN_PAGES: int = 100
+    LARGE_DOC_CHUNK_PAGES: int = 25
     PRICE_PER_PAGE: float = 5.0
+
+    # Worker: seconds between safety-net sweeps when nothing is dispatched
+    WORKER_SWEEP_INTERVAL: float = 30.0
+    # Claimed jobs are reclaimable by other workers once the lease runs out
+    JOB_LEASE_SECONDS: int = 120
+    # Queue order: "fifo", "sjf" (fewest sheets first) or "sjf_aging"
+    SCHEDULING_POLICY: str = "fifo"
+    # sjf_aging: sheets of priority a job gains per minute it waits
+    SCHEDULING_AGING_RATE: float = 10.0
+    # Prepared jobs wait in the print stage (policy order) until a printer has fewer pages queued; 0 = send at once
+    SCHEDULING_HOLD_PAGES: int = 20
+
+    # Print pipeline (convert -> slice -> print)
+    PIPELINE_QUEUE_SIZE: int = 4
+    PIPELINE_CONVERT_WORKERS: int = 1
+
+    # Coalesce small queued jobs into one CUPS submission
+    BATCH_ENABLED: bool = False
+    BATCH_WINDOW_SECONDS: float = 3.0
+    BATCH_MAX_JOBS: int = 5
+    BATCH_MAX_SHEETS: int = 10 # only jobs up to this many sheets are batched
+    BATCH_SEPARATOR_PAGE: bool = True
+
+    # LibreOffice conversion pool (0 workers = one per CPU core)
+    OFFICE_BINARY: str = "libreoffice"
+    OFFICE_WORKERS: int = 0
+    OFFICE_MAX_CONVERSIONS: int = 50
+    OFFICE_MAX_RSS_MB: int = 400
+
+    # Content-addressed cache of converted PDFs (LRU, size capped)
+    CONVERSION_CACHE_DIR: str = "cache/pdf"
+    CONVERSION_CACHE_MAX_MB: int = 512
+
+    # Page previews for the settings page (LRU disk cache, rendered in worker processes)
+    THUMBNAIL_CACHE_DIR: str = "cache/thumbnails"
+    THUMBNAIL_CACHE_MAX_MB: int = 64
+    THUMBNAIL_WIDTH: int = 240
+    THUMBNAIL_WORKERS: int = 1
+
+    # Uploads and everything derived from them (converted, sliced, chunk PDFs)
+    UPLOAD_DIR: str = "uploads"
+    # Storage manager: byte quota for UPLOAD_DIR (0 = retention only) and how long
+    # files of finished or unpaid jobs are kept; never touches paid/printing jobs
+    STORAGE_QUOTA_MB: int = 2048
+    STORAGE_RETAIN_COMPLETED_HOURS: float = 24.0
+    STORAGE_RETAIN_FAILED_HOURS: float = 72.0
+    STORAGE_RETAIN_UNPAID_HOURS: float = 24.0
+    STORAGE_MIN_AGE_MINUTES: float = 30.0 # quota eviction never takes newer files
+    STORAGE_SWEEP_INTERVAL: float = 600.0
+
+    # Resumable uploads: partial files live here until finished or idle for TTL_HOURS
+    UPLOAD_SESSION_DIR: str = "uploads/partial"
+    UPLOAD_SESSION_TTL_HOURS: float = 24.0
+
+    # Speculative conversion right after upload
+    PRECONVERT_WORKERS: int = 1
+    PRECONVERT_ABANDON_MINUTES: int = 30
+    PRECONVERT_PRICING_WAIT: float = 20.0
     
     CLOUDFLARE_TUNNEL_TOKEN: str = ""
 
@@ -0,0 +1,74 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from core.printing.page_utils import PageSet
+from core.printing.scheduling import job_sheets
+
+# daily_stats holds one row per (UTC day a job was created, current status)
+# with job, sheet and revenue totals. SQLite triggers on jobs keep it current:
+# every insert, status change (ORM or bulk UPDATE, any process) and repricing
+# moves the job's contribution from its old row to its new one, inside the
+# same transaction. rebuild() recomputes everything from jobs.
+# Jobs without a created_at (rows inserted by hand before it had a default)
+# are counted under 1970-01-01 so that totals still add up.
+
+DAY = "COALESCE(date({row}created_at), '1970-01-01')"
+
+_ADD = """
+    INSERT INTO daily_stats (day, status, jobs, sheets, revenue)
+    VALUES ({day}, {row}.status, {sign}1, {sign}COALESCE({row}.sheets, 0), {sign}COALESCE({row}.total_cost, 0))
+    ON CONFLICT (day, status) DO UPDATE SET
+        jobs = jobs + excluded.jobs, sheets = sheets + excluded.sheets, revenue = revenue + excluded.revenue;
+"""
+
+_PRUNE = """
+    DELETE FROM daily_stats WHERE day = {day} AND status IS {row}.status AND jobs = 0;
+"""
+
+def _add(row: str, sign: str = "") -> str:
+    return _ADD.format(day=DAY.format(row=row + "."), row=row, sign=sign)
+
+def _remove(row: str) -> str:
+    return _add(row, "-") + _PRUNE.format(day=DAY.format(row=row + "."), row=row)
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS daily_stats_job_insert AFTER INSERT ON jobs
+    BEGIN {_add("NEW")} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS daily_stats_job_update
+    AFTER UPDATE OF status, sheets, total_cost, created_at ON jobs
+    WHEN OLD.status IS NOT NEW.status OR OLD.sheets IS NOT NEW.sheets
+        OR OLD.total_cost IS NOT NEW.total_cost OR OLD.created_at IS NOT NEW.created_at
+    BEGIN {_remove("OLD")} {_add("NEW")} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS daily_stats_job_delete AFTER DELETE ON jobs
+    BEGIN {_remove("OLD")} END""",
+]
+
+def install_triggers(conn: Connection):
+    for trigger in TRIGGERS:
+        conn.execute(text(trigger))
+
+def fill_sheets(conn: Connection) -> int:
+    """
+    Sheets for priced jobs from before jobs.sheets existed. Returns the number filled.
+    """
+    rows = conn.execute(text(
+        "SELECT id, page_range, total_pages, page_count, copies, is_duplex FROM jobs "
+        "WHERE COALESCE(sheets, 0) = 0 AND total_cost > 0"
+    )).fetchall()
+    for job_id, page_range, total_pages, page_count, copies, is_duplex in rows:
+        pages = len(PageSet.parse(page_range, total_pages or page_count or 0))
+        conn.execute(
+            text("UPDATE jobs SET sheets = :sheets WHERE id = :id"),
+            {"sheets": job_sheets(pages, copies or 1, bool(is_duplex)), "id": job_id},
+        )
+    return len(rows)
+
+def rebuild(conn: Connection) -> int:
+    """
+    Recomputes daily_stats from jobs. Returns the number of rows written.
+    """
+    conn.execute(text("DELETE FROM daily_stats"))
+    return conn.execute(text(
+        "INSERT INTO daily_stats (day, status, jobs, sheets, revenue) "
+        f"SELECT {DAY.format(row='')} AS day, status, COUNT(*), SUM(COALESCE(sheets, 0)), SUM(COALESCE(total_cost, 0)) "
+        "FROM jobs GROUP BY day, status"
+    )).rowcount
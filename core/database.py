@@ -1,18 +1,41 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from core.config import settings
+from core.db_profile import CheckpointScheduler, apply_profile, async_url, engine_options
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Worker, pipeline, services and scripts
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+apply_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async def request handlers: aiosqlite runs each connection on its own thread,
+# so queries never block the event loop. Same file, same pragmas.
+async_engine = create_async_engine(
+    async_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, poolclass=AsyncAdaptedQueuePool),
+)
+apply_profile(async_engine.sync_engine)
+# Objects stay readable after commit without a lazy reload (which would need an await)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# WAL checkpoints while idle (started with the web app)
+checkpoint_scheduler = CheckpointScheduler(
+    engine, settings.DB_CHECKPOINT_INTERVAL, settings.DB_CHECKPOINT_IDLE_SECONDS
+)
+checkpoint_scheduler.watch(async_engine.sync_engine)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import traceback
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from core.config import settings
+
+# SQLite tuned for an SD card on a Pi: WAL lets the kiosk's polling reads run
+# while the worker and webhooks commit, synchronous=NORMAL skips the fsync on
+# every commit (WAL stays consistent; a power cut can only lose the last few
+# commits), and a busy timeout makes writers queue instead of failing.
+
+def is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and url.rstrip("/") != "sqlite:"
+
+def async_url(url: str) -> str:
+    """
+    url with SQLite's driver swapped for aiosqlite, for create_async_engine().
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+def engine_options(url: str, poolclass=QueuePool) -> dict:
+    """
+    create_engine() keyword arguments for url (create_async_engine() with
+    poolclass=AsyncAdaptedQueuePool).
+    """
+    options = {"connect_args": {"check_same_thread": False}}
+    if not is_sqlite_file(url) or not settings.DB_SQLITE_PROFILE:
+        return options
+    options["connect_args"]["timeout"] = settings.DB_BUSY_TIMEOUT_MS / 1000
+    # Long-lived threads (worker, pipeline stages, tracker, sweepers) each hold a
+    # connection now and then, plus request threads; keeping them open saves
+    # re-running the pragmas and re-mapping the file on every checkout.
+    options["poolclass"] = poolclass
+    options["pool_size"] = settings.DB_POOL_SIZE
+    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    options["pool_timeout"] = 30
+    return options
+
+def pragmas() -> list:
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.DB_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{settings.DB_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.DB_MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def apply_profile(engine: Engine):
+    """
+    Runs the profile's pragmas on every new connection of a file-backed SQLite engine.
+    """
+    if not is_sqlite_file(str(engine.url)) or not settings.DB_SQLITE_PROFILE:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+class CheckpointScheduler:
+    """
+    Moves the WAL back into the database file while nothing else is going on.
+    SQLite's own auto-checkpoint (every 1000 pages) fires inside whichever
+    commit crosses the threshold, often a webhook or a status update; here a
+    PASSIVE checkpoint runs once the database has seen no commits for
+    DB_CHECKPOINT_IDLE_SECONDS and the CPU is quiet. PASSIVE never waits for
+    readers or writers, so it can't stall a request. Auto-checkpoint stays
+    on as the backstop for busy periods.
+    """
+    def __init__(self, engine: Engine, interval: float, idle_seconds: float):
+        self.engine = engine
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.last_commit = time.monotonic()
+        self.commits_since = 0
+        self.last_result = {}
+        self._started = False
+        self.watch(engine)
+
+    def watch(self, engine: Engine):
+        """
+        Counts commits on another engine over the same file (the async one).
+        """
+        if is_sqlite_file(str(engine.url)) and settings.DB_SQLITE_PROFILE:
+            event.listen(engine, "commit", self._on_commit)
+
+    def _on_commit(self, conn):
+        self.last_commit = time.monotonic()
+        self.commits_since += 1
+
+    def start(self):
+        if self._started or not (is_sqlite_file(str(self.engine.url)) and settings.DB_SQLITE_PROFILE):
+            return
+        self._started = True
+        thread = threading.Thread(target=self._run, name="db-checkpoint", daemon=True)
+        thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.commits_since and self.is_idle():
+                    self.checkpoint()
+            except Exception as e:
+                print(f"DB Checkpoint Error: {e}")
+                traceback.print_exc()
+
+    def is_idle(self) -> bool:
+        if time.monotonic() - self.last_commit < self.idle_seconds:
+            return False
+        try:
+            return os.getloadavg()[0] < 0.5 * (os.cpu_count() or 1)
+        except OSError:
+            return True
+
+    def checkpoint(self) -> dict:
+        commits = self.commits_since
+        started = time.monotonic()
+        with self.engine.connect() as conn:
+            busy, wal_frames, moved = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        # Frames still in use by a reader are picked up next time
+        if moved == wal_frames:
+            self.commits_since = 0
+        self.last_result = {
+            "commits": commits,
+            "wal_frames": wal_frames,
+            "checkpointed": moved,
+            "ms": round(1000 * (time.monotonic() - started), 1),
+        }
+        print(f"DB Checkpoint: {moved}/{wal_frames} WAL frames after {commits} commits "
+              f"({self.last_result['ms']} ms)")
+        return self.last_result
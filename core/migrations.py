@@ -0,0 +1,94 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from core import daily_stats
+
+# Versioned schema changes, applied in order at startup (after create_all, which
+# only creates missing tables). Every step must be safe to run twice: two
+# processes starting together may both apply it before either records it.
+# Append new steps; never edit or reorder released ones.
+
+def _add_columns(conn: Connection, table: str, columns: dict):
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name, definition in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+            print(f"Migrations: added column {table}.{name}")
+
+def _job_columns(conn: Connection):
+    # What scripts/fix_db_schema.py used to patch by hand
+    _add_columns(conn, "jobs", {
+        "total_pages": "INTEGER DEFAULT 0",
+        "page_range": "VARCHAR",
+        "content_hash": "VARCHAR",
+        "worker_id": "VARCHAR",
+        "lease_expires_at": "DATETIME",
+        "cups_job_id": "INTEGER",
+        "pages_printed": "INTEGER DEFAULT 0",
+        "paid_at": "DATETIME",
+        "chunks_total": "INTEGER DEFAULT 0",
+    })
+
+def _job_indexes(conn: Connection):
+    # Same names as Job.__table_args__, so fresh databases already have them
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at ON jobs (status, created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_created_at ON jobs (created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_razorpay_order_id ON jobs (razorpay_order_id)"))
+    conn.execute(text("ANALYZE jobs"))
+
+def _daily_stats(conn: Connection):
+    _add_columns(conn, "jobs", {"sheets": "INTEGER DEFAULT 0"})
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS daily_stats ("
+        "day DATE NOT NULL, status VARCHAR NOT NULL, jobs INTEGER NOT NULL DEFAULT 0, "
+        "sheets INTEGER NOT NULL DEFAULT 0, revenue FLOAT NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (day, status))"
+    ))
+    daily_stats.fill_sheets(conn)
+    daily_stats.install_triggers(conn)
+    daily_stats.rebuild(conn)
+
+MIGRATIONS = [
+    (1, "job columns added before migrations existed", _job_columns),
+    (2, "indexes on job status, created_at and razorpay_order_id", _job_indexes),
+    (3, "daily_stats rollup kept by triggers on jobs", _daily_stats),
+]
+
+def applied_versions(conn: Connection) -> set:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+        "applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def run_migrations(engine: Engine) -> list:
+    """
+    Applies pending migrations, each in its own transaction. Returns the
+    versions applied.
+    """
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name},
+            )
+        print(f"Migrations: applied {version} ({name})")
+        applied.append(version)
+    return applied
+
+def init_db(engine: Engine) -> list:
+    """
+    Startup schema step: creates missing tables, then applies pending
+    migrations. Returns the versions applied.
+    """
+    from core.database import Base
+    import web.models.models  # noqa: F401  registers the tables; create_all creates nothing without it
+    Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
@@ -0,0 +1,100 @@
+import concurrent.futures
+import io
+from typing import List, Tuple
+import img2pdf
+from PIL import Image, ImageOps
+
+A4_MM = (210.0, 297.0)
+MM_PER_INCH = 25.4
+
+# A multi-photo upload is stored as a text file listing its images, one path per line
+IMAGE_SET_EXT = ".imgset"
+
+def write_image_set(path: str, image_paths: List[str]) -> str:
+    with open(path, "w") as f:
+        f.write("\n".join(image_paths) + "\n")
+    return path
+
+def read_image_set(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def fit_size(image_size: Tuple[int, int], box_size: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Largest size with the image's aspect ratio that fits in box_size, never upscaled.
+    """
+    width, height = image_size
+    scale = min(box_size[0] / width, box_size[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def print_box(dpi: int, media_mm: Tuple[float, float] = A4_MM, margin_mm: float = 0.0) -> Tuple[int, int]:
+    """
+    Printable area of a portrait page in pixels at dpi.
+    """
+    return tuple(max(1, round((side - 2 * margin_mm) / MM_PER_INCH * dpi)) for side in media_mm)
+
+def prepare_image(path: str, dpi: int, media_mm: Tuple[float, float] = A4_MM,
+                  margin_mm: float = 0.0, grayscale: bool = False) -> bytes:
+    """
+    Decodes a photo at (roughly) print resolution and returns it as a compact JPEG,
+    upright per its EXIF orientation and turned portrait to fill the page.
+
+    JPEGs are decoded with draft(), so the DCT scaler does most of the downsizing
+    and a 12 MP photo never exists in memory at full size.
+    """
+    mode = "L" if grayscale else "RGB"
+    with Image.open(path) as img:
+        # Displayed size: EXIF orientations 5-8 swap width and height
+        orientation = img.getexif().get(0x0112, 1)
+        width, height = img.size
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        landscape = width > height
+
+        box = print_box(dpi, media_mm, margin_mm)
+        if landscape:
+            box = (box[1], box[0])
+        target = fit_size((width, height), box)
+
+        if img.format == "JPEG":
+            draft_size = (target[1], target[0]) if orientation in (5, 6, 7, 8) else target
+            img.draft(mode, draft_size)
+
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto paper white
+            img = img.convert("RGBA")
+            background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+            img = Image.alpha_composite(background, img)
+        img = img.convert(mode)
+        # reducing_gap: integer-factor reduce() first, then a cheap final resample
+        img.thumbnail(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if landscape:
+            img = img.transpose(Image.Transpose.ROTATE_90)
+
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=85, optimize=True)
+        return out.getvalue()
+
+def images_to_pdf(paths: List[str], output_path: str, dpi: int = 300, media_mm: Tuple[float, float] = A4_MM,
+                  margin_mm: float = 0.0, grayscale: bool = False, workers: int = None) -> str:
+    """
+    Builds a PDF with one page per image, each fitted into the media size.
+    Images are decoded in parallel (Pillow releases the GIL while decoding and
+    resizing, so threads use every core); page order follows paths.
+    """
+    def prepare(path):
+        return prepare_image(path, dpi, media_mm, margin_mm, grayscale)
+
+    if len(paths) == 1:
+        pages = [prepare(paths[0])]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(prepare, paths))
+
+    page_size = (img2pdf.mm_to_pt(media_mm[0]), img2pdf.mm_to_pt(media_mm[1]))
+    border = (img2pdf.mm_to_pt(margin_mm), img2pdf.mm_to_pt(margin_mm)) if margin_mm > 0 else None
+    layout = img2pdf.get_layout_fun(page_size, border=border, fit=img2pdf.FitMode.into)
+    with open(output_path, "wb") as f:
+        f.write(img2pdf.convert(pages, layout_fun=layout))
+    return output_path
@@ -0,0 +1,57 @@
+from typing import List, NamedTuple
+import numpy as np
+import fitz  # PyMuPDF
+
+# Low enough to render hundreds of pages in a second, high enough that a single line of text shows
+ANALYSIS_DPI = 18
+
+# A page is blank when fewer than this fraction of pixels are visibly darker than paper.
+# At ANALYSIS_DPI a lone 9pt page number on A4 marks only 2 of ~31k pixels (6e-5)
+BLANK_MAX_MARKED = 0.00002
+MARK_LEVEL = 235
+
+# A pixel is coloured when its channels differ by more than this; a page is colour
+# when more than COLOR_MIN_PIXELS of it is (so scanner tint and anti-aliasing stay mono)
+CHROMA_LEVEL = 40
+COLOR_MIN_PIXELS = 0.001
+
+class PageInfo(NamedTuple):
+    page_number: int    # 0-based
+    width_pt: float
+    height_pt: float
+    ink_coverage: float # mean darkness, 0 = white page, 1 = solid black
+    is_blank: bool
+    is_color: bool
+
+def analyze_pixels(samples: np.ndarray) -> tuple:
+    """
+    (ink_coverage, is_blank, is_color) for an RGB pixel array of shape (h, w, 3).
+    """
+    pixels = samples.astype(np.int16)
+    gray = pixels.mean(axis=2)
+    ink_coverage = float((255.0 - gray).mean() / 255.0)
+    is_blank = bool((gray < MARK_LEVEL).mean() < BLANK_MAX_MARKED)
+    chroma = pixels.max(axis=2) - pixels.min(axis=2)
+    is_color = bool((chroma > CHROMA_LEVEL).mean() > COLOR_MIN_PIXELS)
+    return ink_coverage, is_blank, is_color
+
+def analyze_pdf(pdf_path: str, dpi: int = ANALYSIS_DPI) -> List[PageInfo]:
+    """
+    One pass over the document: every page rendered once at low resolution
+    and measured with NumPy. Runs in a worker process (see web/services/page_index.py).
+    """
+    results = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+            samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            ink_coverage, is_blank, is_color = analyze_pixels(samples[:, :, :3])
+            results.append(PageInfo(
+                page_number=page.number,
+                width_pt=round(page.rect.width, 2),
+                height_pt=round(page.rect.height, 2),
+                ink_coverage=round(ink_coverage, 4),
+                is_blank=is_blank,
+                is_color=is_color,
+            ))
+    return results
@@ -1,4 +1,119 @@
-from typing import List, Set
+from bisect import bisect_right
+from typing import Iterator, List, Tuple
+
+class PageSet:
+    """
+    A set of 0-indexed page numbers stored as sorted, merged, half-open intervals.
+
+    Counting, membership and "is this every page?" are O(#intervals), so a range
+    like "1-10000000" on a huge document costs the same as "1-5".
+    Iterate it only when the actual page numbers are needed (e.g. fitz select).
+    """
+    __slots__ = ("_intervals", "total_pages")
+
+    def __init__(self, intervals: List[Tuple[int, int]], total_pages: int):
+        self.total_pages = max(total_pages, 0)
+        merged: List[Tuple[int, int]] = []
+        for start, end in sorted(intervals):
+            # Clip to the document
+            start, end = max(start, 0), min(end, self.total_pages)
+            if start >= end:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self._intervals = merged
+
+    @classmethod
+    def all(cls, total_pages: int) -> "PageSet":
+        return cls([(0, total_pages)], total_pages)
+
+    @classmethod
+    def parse(cls, range_str: str, total_pages: int) -> "PageSet":
+        """
+        Parses a 1-based range string like "1-5, 8, 10-12" (or "all" / "").
+        Same rules as parse_page_range: out-of-range pages are clipped,
+        "5-1" means "1-5" and malformed parts are ignored.
+        """
+        if not range_str or not range_str.strip() or range_str.strip().lower() == "all":
+            return cls.all(total_pages)
+
+        intervals = []
+        for part in range_str.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                if '-' in part:
+                    start_str, end_str = part.split('-', 1)
+                    start, end = int(start_str), int(end_str)
+                    if start > end:
+                        start, end = end, start
+                else:
+                    start = end = int(part)
+            except ValueError:
+                # Ignore malformed parts like "a-b" or "xyz"
+                continue
+            # 1-based inclusive -> 0-based half-open
+            intervals.append((start - 1, end))
+        return cls(intervals, total_pages)
+
+    @property
+    def intervals(self) -> List[Tuple[int, int]]:
+        return list(self._intervals)
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self._intervals)
+
+    def __contains__(self, page: int) -> bool:
+        index = bisect_right(self._intervals, (page, float("inf"))) - 1
+        return index >= 0 and self._intervals[index][0] <= page < self._intervals[index][1]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self._intervals:
+            yield from range(start, end)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PageSet):
+            return NotImplemented
+        return self._intervals == other._intervals
+
+    def __repr__(self) -> str:
+        return f"PageSet({self.to_cups_ranges() or 'empty'} of {self.total_pages})"
+
+    def is_all(self) -> bool:
+        return self._intervals == [(0, self.total_pages)] or (self.total_pages == 0 and not self._intervals)
+
+    def split(self, size: int) -> List["PageSet"]:
+        """
+        Cuts the selection into consecutive chunks of `size` selected pages
+        (the last one may be shorter), in page order.
+        """
+        chunks = []
+        current: List[Tuple[int, int]] = []
+        room = size
+        for start, end in self._intervals:
+            while start < end:
+                take = min(room, end - start)
+                current.append((start, start + take))
+                start += take
+                room -= take
+                if room == 0:
+                    chunks.append(PageSet(current, self.total_pages))
+                    current, room = [], size
+        if current:
+            chunks.append(PageSet(current, self.total_pages))
+        return chunks
+
+    def to_cups_ranges(self) -> str:
+        """
+        Canonical 1-based form, e.g. "1-5,8". Usable as the IPP page-ranges option.
+        """
+        parts = []
+        for start, end in self._intervals:
+            parts.append(str(start + 1) if end - start == 1 else f"{start + 1}-{end}")
+        return ",".join(parts)
 
 def parse_page_range(range_str: str, total_pages: int) -> List[int]:
     """
@@ -12,60 +127,10 @@ def parse_page_range(range_str: str, total_pages: int) -> List[int]:
         List[int]: A sorted list of unique 0-indexed page numbers to print.
                    Returns [0, 1, ... total_pages-1] if input is empty or 'all'.
                    Ignores out-of-range pages.
+
+    Materializes every page; prefer PageSet.parse when only the count or
+    membership is needed.
     """
-    if not range_str or not range_str.strip() or range_str.lower() == "all":
-        return list(range(total_pages))
-    
-    pages: Set[int] = set()
-    parts = range_str.split(',')
-    
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-            
-        try:
-            if '-' in part:
-                # Range: "1-5"
-                start_str, end_str = part.split('-', 1)
-                start = int(start_str)
-                end = int(end_str)
-                
-                # Handle "min-max" logic if user typed backwards like "5-1" -> "1-5"
-                if start > end:
-                    start, end = end, start
-                
-                # Apply bounds immediately
-                # User input is 1-indexed, we convert to 0-indexed for internal use later? 
-                # Actually, standard print ranges are 1-based. Let's assume 1-based input.
-                # We will output 1-based for now, OR 0-based? 
-                # The prompt example said: "1,3-5" -> [1,3,4,5]. This implies 1-based.
-                # Let's Stick to 1-based in, 0-based out for pypdf consumption? 
-                # Wait, the prompt output example was [1,3,4,5...]. 
-                # Let's return 0-based indices for pypdf, but the logic should handle 1-based input.
-                
-                for i in range(start, end + 1):
-                    if 1 <= i <= total_pages:
-                        pages.add(i - 1) # 0-indexed
-            else:
-                # Single page: "8"
-                page = int(part)
-                if 1 <= page <= total_pages:
-                    pages.add(page - 1) # 0-indexed
-                    
-        except ValueError:
-            # Ignore malformed parts like "a-b" or "xyz"
-            continue
-            
-    sorted_pages = sorted(list(pages))
-    
-    # Fail-safe: If result is empty (e.g. all inputs were invalid), return ALL pages?
-    # Or return empty list? Returning all pages might be safer for "user made a typo but paid".
-    # But strictly, if I ask for page 100 in a 10 page doc, I get nothing.
-    # Let's return empty if the explicit range was invalid but syntactically not "all".
-    # User requirement: "all settings... must be printed exactly". 
     # If I say "1-5" and it's a 3 page doc, I expect 1,2,3.
-    # If I say "50-60" and it's a 3 page doc, I expect nothing? Or error?
-    # Let's stick to the logic: ignore out of bounds.
-    
-    return sorted_pages
+    # If I say "50-60" and it's a 3 page doc, I get nothing: out of bounds is ignored.
+    return list(PageSet.parse(range_str, total_pages))
@@ -0,0 +1,108 @@
+import textwrap
+import unicodedata
+from typing import List
+import fitz  # PyMuPDF
+
+A4_PT = (595.0, 842.0)
+# MuPDF's built-in Courier, embedded as a Unicode font: Latin, Greek, Cyrillic and
+# typographic punctuation (the plain "cour" base font only encodes Latin-1).
+# Its glyphs are all 0.6 em wide, which makes wrapping exact.
+MONO_FONT = fitz.Font("cour")
+COURIER_ADVANCE = 0.6
+LINE_SPACING = 1.2
+TAB_SIZE = 8
+
+def decode_text(data: bytes) -> str:
+    """
+    UTF-8 (with or without BOM) if it decodes, else Windows-1252 so stray bytes never fail a job.
+    """
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+class MissingGlyphs(ValueError):
+    """
+    The text uses characters the monospace font has no glyph for (e.g. Indic or CJK scripts).
+    """
+
+def missing_glyphs(text: str) -> str:
+    """
+    The distinct printable characters of text that MONO_FONT cannot draw, in order of appearance.
+    """
+    missing = []
+    for char in dict.fromkeys(text):
+        if char.isspace() or unicodedata.category(char).startswith("C"):
+            continue
+        if not MONO_FONT.has_glyph(ord(char)):
+            missing.append(char)
+    return "".join(missing)
+
+def wrap_lines(text: str, width: int) -> List[str]:
+    """
+    Splits text into display lines of at most `width` characters, breaking at
+    spaces where possible. Blank lines are kept; a form feed becomes "\\f" on its own line.
+    """
+    lines = []
+    for raw in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        pieces = raw.split("\f")
+        for index, piece in enumerate(pieces):
+            if index:
+                lines.append("\f")
+            piece = piece.expandtabs(TAB_SIZE).rstrip()
+            if not piece:
+                if len(pieces) == 1:
+                    lines.append("")
+                continue
+            lines.extend(textwrap.wrap(piece, width, replace_whitespace=False, drop_whitespace=True,
+                                       break_long_words=True, break_on_hyphens=False) or [""])
+    return lines
+
+def paginate(lines: List[str], per_page: int) -> List[List[str]]:
+    """
+    Groups lines into pages of per_page lines, starting a new page at every form feed.
+    """
+    pages, current = [], []
+    for line in lines:
+        if line == "\f":
+            pages.append(current)
+            current = []
+            continue
+        current.append(line)
+        if len(current) == per_page:
+            pages.append(current)
+            current = []
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+def text_to_pdf(input_path: str, output_path: str, font_size: float = 10.0,
+                margin_pt: float = 42.0, page_size=A4_PT) -> str:
+    """
+    Lays out a plain-text file as monospace A4 pages with PyMuPDF: wrapped to the
+    printable width and paginated, one insert_text call per page.
+    Raises MissingGlyphs rather than print blanks for characters the font lacks.
+    """
+    with open(input_path, "rb") as f:
+        text = decode_text(f.read())
+    missing = missing_glyphs(text)
+    if missing:
+        raise MissingGlyphs(f"No monospace glyphs for {missing[:10]!r}")
+
+    width, height = page_size
+    chars_per_line = max(1, int((width - 2 * margin_pt) / (font_size * COURIER_ADVANCE)))
+    line_height = font_size * LINE_SPACING
+    lines_per_page = max(1, int((height - 2 * margin_pt) / line_height))
+
+    doc = fitz.open()
+    for page_lines in paginate(wrap_lines(text, chars_per_line), lines_per_page):
+        page = doc.new_page(width=width, height=height)
+        if page_lines:
+            page.insert_font(fontname="mono", fontbuffer=MONO_FONT.buffer)
+            page.insert_text((margin_pt, margin_pt + font_size), "\n".join(page_lines),
+                             fontname="mono", fontsize=font_size, lineheight=LINE_SPACING)
+    # Keep only the glyphs used instead of the whole font
+    doc.subset_fonts()
+    doc.save(output_path, garbage=3, deflate=True)
+    doc.close()
+    return output_path
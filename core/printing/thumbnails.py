@@ -0,0 +1,13 @@
+import fitz  # PyMuPDF
+
+def render_thumbnail(pdf_path: str, page_number: int, width: int, output_path: str, quality: int = 80) -> str:
+    """
+    Renders one page (0-based) as a JPEG `width` pixels wide. Only that page is
+    parsed; runs in a worker process (see web/services/thumbnails.py).
+    """
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number]
+        zoom = width / page.rect.width
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+        pix.save(output_path, output="jpeg", jpg_quality=quality)
+    return output_path
@@ -0,0 +1,12 @@
+import concurrent.futures
+import multiprocessing
+
+def spawn_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Process pool for CPU-heavy rendering, kept off the web server's GIL.
+    Workers are spawned, not forked: forking a process that runs threads
+    (uvicorn, the print pipeline) can copy locks held mid-operation.
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"),
+    )
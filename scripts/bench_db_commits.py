@@ -0,0 +1,102 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from core.database import Base
+from core.db_profile import apply_profile, engine_options
+from web.models.models import Job
+
+# Commit latency of the job lifecycle (insert, processing, completed: three
+# commits per job) on a bare SQLite engine vs. the flash storage profile, with
+# a kiosk-style reader polling alongside.
+# Run it on the card the database lives on: python scripts/bench_db_commits.py --jobs 200 --dir .
+
+def make_engine(url: str, tuned: bool):
+    if not tuned:
+        return create_engine(url, connect_args={"check_same_thread": False})
+    engine = create_engine(url, **engine_options(url))
+    apply_profile(engine)
+    return engine
+
+def run(directory: str, tuned: bool, jobs: int, poll_interval: float) -> dict:
+    workdir = tempfile.mkdtemp(prefix="printbot_bench_", dir=directory)
+    engine = make_engine(f"sqlite:///{workdir}/bench.db", tuned)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    stop = threading.Event()
+    reads, read_errors = [], [0]
+
+    def kiosk():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT count(*) FROM jobs WHERE status = 'printing'")).scalar()
+                reads.append(time.perf_counter() - started)
+            except Exception:
+                read_errors[0] += 1
+            time.sleep(poll_interval)
+
+    reader = threading.Thread(target=kiosk, daemon=True)
+    reader.start()
+
+    commits = []
+    db = Session()
+    try:
+        for _ in range(jobs):
+            job = Job(id=str(uuid.uuid4()), filename="bench.pdf", file_path="bench.pdf", status="paid")
+            for status in (None, "processing", "completed"):
+                if status:
+                    job.status = status
+                else:
+                    db.add(job)
+                started = time.perf_counter()
+                db.commit()
+                commits.append(time.perf_counter() - started)
+    finally:
+        db.close()
+        stop.set()
+        reader.join()
+        with engine.connect() as conn:
+            journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        engine.dispose()
+        shutil.rmtree(workdir)
+
+    commits.sort()
+    reads.sort()
+    ms = lambda seconds: round(1000 * seconds, 2)
+    return {
+        "profile": "tuned" if tuned else "bare",
+        "journal": journal,
+        "commits": len(commits),
+        "commit_mean_ms": ms(statistics.mean(commits)),
+        "commit_p50_ms": ms(commits[len(commits) // 2]),
+        "commit_p95_ms": ms(commits[int(len(commits) * 0.95)]),
+        "read_p95_ms": ms(reads[int(len(reads) * 0.95)]) if reads else None,
+        "read_errors": read_errors[0],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--dir", default=".", help="directory on the storage to test (not tmpfs)")
+    parser.add_argument("--poll", type=float, default=0.01, help="seconds between kiosk reads")
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        result = run(args.dir, tuned, args.jobs, args.poll)
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+import requests
+
+sys.path.append(os.getcwd())
+
+# Request latency of the endpoints browsers and the kiosk poll (payment status,
+# /status) with many pollers at once, while a worker-style thread commits
+# status changes through the synchronous session.
+# Usage (server running, from the project root so both use the same database):
+#   python scripts/measure_poll_latency.py --url http://localhost:8000 --pollers 50 --seconds 20
+
+def poll(url: str, path: str, interval: float, deadline: float, latencies: list, errors: list):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            session.get(f"{url}{path}", timeout=10).raise_for_status()
+            latencies.append(time.monotonic() - started)
+        except Exception:
+            errors.append(path)
+        time.sleep(interval)
+
+def churn(order_id: str, deadline: float, commits: list):
+    from core.database import SessionLocal
+    from web.models.models import Job
+    statuses = ["payment_pending", "uploaded"]
+    db = SessionLocal()
+    try:
+        job = Job(id=str(uuid.uuid4()), filename="poll_bench.pdf", file_path="poll_bench.pdf",
+                  status="uploaded", razorpay_order_id=order_id)
+        db.add(job)
+        db.commit()
+        while time.monotonic() < deadline:
+            job.status = statuses[len(commits) % 2]
+            db.commit()
+            commits.append(1)
+            time.sleep(0.01)
+        db.delete(job)
+        db.commit()
+    finally:
+        db.close()
+
+def percentile(values: list, fraction: float) -> float:
+    return 1000 * values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pollers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between one poller's requests")
+    parser.add_argument("--no-writer", action="store_true", help="skip the committing thread")
+    args = parser.parse_args()
+
+    order_id = f"order_bench_{uuid.uuid4().hex[:8]}"
+    deadline = time.monotonic() + args.seconds
+    paths = [f"/payment-status/{order_id}", "/status"]
+    latencies = {path: [] for path in paths}
+    errors, commits = [], []
+
+    threads = [
+        threading.Thread(target=poll, args=(args.url, paths[i % 2], args.interval, deadline, latencies[paths[i % 2]], errors))
+        for i in range(args.pollers)
+    ]
+    if not args.no_writer:
+        threads.append(threading.Thread(target=churn, args=(order_id, deadline, commits)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for path, values in latencies.items():
+        values.sort()
+        if values:
+            print(f"{path.split('/')[1]:>15}: {len(values)} requests, p50 {percentile(values, 0.5):.1f} ms, "
+                  f"p95 {percentile(values, 0.95):.1f} ms, p99 {percentile(values, 0.99):.1f} ms, max {1000 * values[-1]:.1f} ms")
+    print(f"Errors: {len(errors)}, worker commits: {len(commits)}")
+    loop = requests.get(f"{args.url}/health", timeout=30).json()["components"].get("event_loop", {})
+    print(f"Server event-loop lag: {loop}")
+
+if __name__ == "__main__":
+    main()
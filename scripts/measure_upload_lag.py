@@ -0,0 +1,59 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import requests
+
+# Measures how responsive the server stays while several large uploads are in flight.
+# Usage (server running): python scripts/measure_upload_lag.py --url http://localhost:8000 --uploads 3 --size-mb 90
+
+def make_file(size_mb: int) -> str:
+    path = os.path.join(tempfile.gettempdir(), f"printbot_lag_{size_mb}mb.pdf")
+    if not os.path.exists(path) or os.path.getsize(path) != size_mb * 1024 * 1024:
+        print(f"Creating {size_mb} MB test file at {path}...")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+            f.write(os.urandom(size_mb * 1024 * 1024 - 9))
+    return path
+
+def upload(url: str, path: str, results: list):
+    started = time.monotonic()
+    with open(path, "rb") as f:
+        response = requests.post(f"{url}/upload", files={"file": ("lag_test.pdf", f, "application/pdf")},
+                                 allow_redirects=False)
+    results.append((response.status_code, time.monotonic() - started))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--uploads", type=int, default=3)
+    parser.add_argument("--size-mb", type=int, default=89)
+    args = parser.parse_args()
+
+    path = make_file(args.size_mb)
+    results = []
+    threads = [threading.Thread(target=upload, args=(args.url, path, results)) for _ in range(args.uploads)]
+    for thread in threads:
+        thread.start()
+
+    # Meanwhile, time a cheap endpoint the way a polling kiosk would
+    latencies = []
+    while any(thread.is_alive() for thread in threads):
+        started = time.monotonic()
+        requests.get(f"{args.url}/status")
+        latencies.append(time.monotonic() - started)
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+
+    loop = requests.get(f"{args.url}/health").json()["components"].get("event_loop", {})
+    latencies.sort()
+    print(f"Uploads: {[f'{code} in {secs:.1f}s' for code, secs in results]}")
+    if latencies:
+        print(f"/status during uploads: {len(latencies)} polls, "
+              f"median {1000 * latencies[len(latencies) // 2]:.0f} ms, max {1000 * latencies[-1]:.0f} ms")
+    print(f"Server event-loop lag: {loop}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine, Base
+from core.migrations import run_migrations
+from core import daily_stats
+import web.models.models  # registers the tables
+
+# Recomputes the daily_stats rollup from jobs, e.g. after editing jobs by hand
+# with the triggers dropped. Safe to run while the app is up: it is one transaction.
+
+def rebuild():
+    print(f"Rebuilding daily_stats in: {engine.url}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        filled = daily_stats.fill_sheets(conn)
+        daily_stats.install_triggers(conn)
+        rows = daily_stats.rebuild(conn)
+    print(f"Filled sheets for {filled} jobs, wrote {rows} daily_stats rows.")
+
+if __name__ == "__main__":
+    rebuild()
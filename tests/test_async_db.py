@@ -0,0 +1,63 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from core.database import Base
+from core.db_profile import apply_profile, async_url, engine_options
+from web.models.models import Job
+
+class TestAsyncUrl(unittest.TestCase):
+
+    def test_sqlite_gets_aiosqlite(self):
+        self.assertEqual(async_url("sqlite:///./printbot.db"), "sqlite+aiosqlite:///./printbot.db")
+        self.assertEqual(async_url("sqlite://"), "sqlite+aiosqlite://")
+
+    def test_other_urls_are_left_alone(self):
+        self.assertEqual(async_url("sqlite+aiosqlite:///x.db"), "sqlite+aiosqlite:///x.db")
+        self.assertEqual(async_url("postgresql+asyncpg://db/printbot"), "postgresql+asyncpg://db/printbot")
+
+class TestAsyncSession(unittest.TestCase):
+    """
+    Request handlers (async engine) and the worker (sync engine) share one file.
+    """
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.url = f"sqlite:///{os.path.join(self.workdir, 't.db')}"
+        self.engine = create_engine(self.url, **engine_options(self.url))
+        apply_profile(self.engine)
+        Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.workdir)
+
+    def test_sees_worker_commits_and_commits_back(self):
+        with Session(bind=self.engine) as db:
+            db.add(Job(id="a", filename="a.pdf", file_path="a.pdf", status="payment_pending", razorpay_order_id="plink_a"))
+            db.commit()
+
+        async def webhook():
+            async_engine = create_async_engine(async_url(self.url), **engine_options(self.url, poolclass=AsyncAdaptedQueuePool))
+            apply_profile(async_engine.sync_engine)
+            try:
+                async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                    job = (await db.execute(select(Job).where(Job.razorpay_order_id == "plink_a"))).scalar()
+                    job.status = "paid"
+                    await db.commit()
+                    conn = await db.connection()
+                    journal = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+                    return job.status, journal
+            finally:
+                await async_engine.dispose()
+
+        self.assertEqual(asyncio.run(webhook()), ("paid", "wal"))
+        with Session(bind=self.engine) as db:
+            self.assertEqual(db.get(Job, "a").status, "paid")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import datetime
+import unittest
+from sqlalchemy import create_engine, event, text, update
+from sqlalchemy.orm import Session
+from core import daily_stats
+from core.database import Base
+from core.migrations import run_migrations
+from web.models.models import DailyStat, Job
+from tests.test_migrations import LEGACY_JOBS
+
+def snapshot(conn) -> list:
+    return conn.execute(text("SELECT day, status, jobs, sheets, revenue FROM daily_stats WHERE jobs != 0 ORDER BY day, status")).fetchall()
+
+class TestDailyStats(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        run_migrations(self.engine)
+        self.db = Session(bind=self.engine)
+        self.day = datetime.datetime(2026, 3, 1, 10, 30)
+
+    def tearDown(self):
+        self.db.close()
+
+    def add(self, job_id, status="uploaded", days=0, **fields):
+        self.db.add(Job(id=job_id, filename="a.pdf", file_path="a.pdf", status=status,
+                        created_at=self.day + datetime.timedelta(days=days), **fields))
+        self.db.commit()
+
+    def assertMatchesRebuild(self):
+        with self.engine.begin() as conn:
+            live = snapshot(conn)
+            daily_stats.rebuild(conn)
+            self.assertEqual(live, snapshot(conn))
+
+    def test_orm_transitions(self):
+        self.add("a")
+        self.add("b", days=1)
+        job = self.db.get(Job, "a")
+        job.total_cost, job.sheets, job.status = 6.0, 3, "paid"
+        self.db.commit()
+        job.status = "completed"
+        self.db.commit()
+        self.db.delete(self.db.get(Job, "b"))
+        self.db.commit()
+
+        row = self.db.query(DailyStat).one()
+        self.assertEqual((row.day, row.status, row.jobs, row.sheets, row.revenue),
+                         (datetime.date(2026, 3, 1), "completed", 1, 3, 6.0))
+        self.assertMatchesRebuild()
+
+    def test_bulk_updates_are_counted(self):
+        # the worker claims and finishes jobs with Core UPDATEs, not the ORM
+        for job_id in "abc":
+            self.add(job_id, status="paid", total_cost=2.0, sheets=1)
+        self.db.execute(update(Job).where(Job.status == "paid").values(status="processing"))
+        self.db.execute(update(Job).where(Job.id == "a").values(status="failed"))
+        self.db.commit()
+
+        counts = dict(self.db.query(DailyStat.status, DailyStat.jobs).filter(DailyStat.jobs != 0))
+        self.assertEqual(counts, {"processing": 2, "failed": 1})
+        self.assertMatchesRebuild()
+
+    def test_day_range_read_uses_primary_key(self):
+        statements = []
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+            return "EXPLAIN QUERY PLAN " + statement, parameters
+        event.listen(self.engine, "before_cursor_execute", explain, retval=True)
+        try:
+            query = self.db.query(DailyStat).filter(DailyStat.day.between(datetime.date(2026, 3, 1), datetime.date(2026, 3, 7)))
+            with self.engine.connect() as conn:
+                plan = " | ".join(row[-1] for row in conn.execute(query.statement))
+        finally:
+            event.remove(self.engine, "before_cursor_execute", explain)
+        self.assertIn("SEARCH daily_stats USING INDEX sqlite_autoindex_daily_stats_1 (day>? AND day<?)", plan)
+
+class TestBackfill(unittest.TestCase):
+
+    def test_legacy_jobs_get_sheets_and_rollup(self):
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(LEGACY_JOBS))
+            conn.execute(text(
+                "INSERT INTO jobs (id, filename, file_path, page_count, copies, is_duplex, status, created_at, total_cost) "
+                "VALUES ('a', 'a.pdf', 'a.pdf', 5, 2, 1, 'completed', '2026-03-01 09:00:00', 15.0)"
+            ))
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+        with engine.begin() as conn:
+            self.assertEqual(conn.execute(text("SELECT sheets FROM jobs")).scalar(), 6)
+            self.assertEqual(snapshot(conn), [("2026-03-01", "completed", 1, 6, 15.0)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+import unittest
+from PIL import Image
+from core.printing.images import fit_size, prepare_image, print_box
+
+class TestFitting(unittest.TestCase):
+
+    def test_print_box_a4_300dpi(self):
+        # 210 x 297 mm at 300 dpi
+        self.assertEqual(print_box(300), (2480, 3508))
+
+    def test_margin_shrinks_box(self):
+        self.assertEqual(print_box(300, margin_mm=5), (2362, 3390))
+
+    def test_fit_keeps_aspect(self):
+        self.assertEqual(fit_size((4000, 3000), (2000, 2000)), (2000, 1500))
+
+    def test_fit_never_upscales(self):
+        self.assertEqual(fit_size((800, 600), (2480, 3508)), (800, 600))
+
+class TestPrepareImage(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def save_jpeg(self, size, orientation):
+        path = os.path.join(self.dir, f"photo_{orientation}.jpg")
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        Image.new("RGB", size, (200, 40, 40)).save(path, exif=exif)
+        return path
+
+    def prepared_size(self, path, **kwargs):
+        with Image.open(io.BytesIO(prepare_image(path, dpi=100, **kwargs))) as img:
+            return img.size, img.mode
+
+    def test_landscape_is_turned_portrait_and_downsized(self):
+        # A4 at 100 dpi is 827 x 1169
+        size, _ = self.prepared_size(self.save_jpeg((2400, 1800), 1))
+        self.assertEqual(size, (827, 1103))
+
+    def test_exif_rotation_applied(self):
+        # Stored landscape but EXIF says rotate 90: displayed portrait, stays portrait
+        size, _ = self.prepared_size(self.save_jpeg((2400, 1800), 6))
+        self.assertEqual(size, (827, 1103))
+
+    def test_grayscale(self):
+        _, mode = self.prepared_size(self.save_jpeg((300, 400), 1), grayscale=True)
+        self.assertEqual(mode, "L")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import fitz
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from core.config import settings
+from core.database import Base
+from core.db_profile import apply_profile, engine_options
+from core.printing.scheduling import WaitStats
+from web.models.models import Job, PrintChunk
+
+try:
+    import cups  # noqa: F401  printer_service connects to CUPS at import
+    from web.services import job_processor as processor_module
+    from web.services.cups_tracker import CupsTracker
+except ImportError:
+    processor_module = None
+
+@unittest.skipIf(processor_module is None, "pycups is not installed")
+class TestClaimAndLease(unittest.TestCase):
+    """
+    Two workers sharing one database file must never both own a job.
+    """
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(self.workdir, 't.db')}"
+        self.engine = create_engine(url, **engine_options(url))
+        apply_profile(self.engine)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        patcher = mock.patch.object(processor_module, "SessionLocal", self.Session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.a = processor_module.JobProcessor()
+        self.b = processor_module.JobProcessor()
+        self.a.worker_id, self.b.worker_id = "pi:1", "pi:2"
+        with self.Session() as db:
+            db.add(Job(id="j", filename="a.pdf", file_path="a.pdf", status="paid"))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.workdir)
+
+    def claim(self, processor) -> bool:
+        with self.Session() as db:
+            return processor.claim(db, "j")
+
+    def test_exactly_one_claim_wins(self):
+        start = threading.Barrier(8)
+        results = []
+        def race(processor):
+            start.wait()
+            results.append((processor.worker_id, self.claim(processor)))
+
+        threads = [threading.Thread(target=race, args=(p,)) for p in (self.a, self.b) * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        winners = [worker for worker, won in results if won]
+        self.assertEqual(len(winners), 1)
+        with self.Session() as db:
+            job = db.get(Job, "j")
+            self.assertEqual((job.status, job.worker_id), ("processing", winners[0]))
+
+    def test_live_lease_is_not_reclaimed(self):
+        self.assertTrue(self.claim(self.a))
+        self.assertFalse(self.claim(self.b))
+        self.assertTrue(self.a._still_owned("j"))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.assertTrue(self.claim(self.a))
+        with self.Session() as db:
+            db.execute(update(Job).where(Job.id == "j").values(
+                lease_expires_at=datetime.datetime.utcnow() - datetime.timedelta(seconds=1)))
+            db.commit()
+
+        self.assertTrue(self.claim(self.b))
+        # The first owner must find out before it sends anything to CUPS
+        self.assertFalse(self.a._still_owned("j"))
+        self.assertTrue(self.b._still_owned("j"))
+        with self.Session() as db:
+            self.assertEqual(db.get(Job, "j").worker_id, "pi:2")
+
+    def test_stalled_chunk_stream_fails(self):
+        self.assertTrue(self.claim(self.a))
+        tracker = CupsTracker(poll_interval=1)
+
+        def stream(chunks: int):
+            for seq in range(chunks):
+                self.a._record_chunk("j", seq, 100 + seq, 25, last=seq + 1 == 4)
+                if seq == 0:
+                    self.a._set_status("j", "printing", cups_job_id=100, chunks_total=4,
+                                       lease_expires_at=datetime.datetime.utcnow() + self.a.lease)
+
+        def roll_up() -> str:
+            with self.Session() as db:
+                job = db.get(Job, "j")
+                tracker._roll_up(db, job)
+                db.commit()
+                return job.status
+
+        stream(2)
+        self.assertEqual(roll_up(), "printing")  # still streaming
+        with self.Session() as db:
+            db.execute(update(Job).where(Job.id == "j").values(
+                lease_expires_at=datetime.datetime.utcnow() - datetime.timedelta(seconds=1)))
+            db.commit()
+        self.assertEqual(roll_up(), "failed")  # the worker died after chunk 2 of 4
+
+    def test_finished_chunk_stream_drops_its_lease(self):
+        self.assertTrue(self.claim(self.a))
+        for seq in range(2):
+            self.a._record_chunk("j", seq, 100 + seq, 25, last=seq == 1)
+            if seq == 0:
+                self.a._set_status("j", "printing", cups_job_id=100, chunks_total=2,
+                                   lease_expires_at=datetime.datetime.utcnow() + self.a.lease)
+        with self.Session() as db:
+            job = db.get(Job, "j")
+            self.assertEqual((job.status, job.lease_expires_at), ("printing", None))
+            self.assertEqual(db.query(PrintChunk).filter(PrintChunk.job_id == "j").count(), 2)
+
+def make_pdf(path: str, name: str, pages: int) -> str:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"{name}{number}")
+    doc.save(path)
+    doc.close()
+    return path
+
+def page_texts(path: str) -> list:
+    with fitz.open(path) as doc:
+        return [page.get_text().strip() for page in doc]
+
+def context(job_id: str, pages: int = 1, is_duplex: bool = False, copies: int = 1):
+    ctx = processor_module.PrintContext(Job(id=job_id, filename=f"{job_id}.pdf", file_path=f"{job_id}.pdf",
+                                            copies=copies, is_duplex=is_duplex))
+    ctx.print_path = ctx.file_path
+    ctx.print_pages = pages
+    return ctx
+
+@unittest.skipIf(processor_module is None, "pycups is not installed")
+class TestBatching(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.a = make_pdf(os.path.join(self.workdir, "a.pdf"), "A", 3)
+        self.b = make_pdf(os.path.join(self.workdir, "b.pdf"), "B", 2)
+        self.out = os.path.join(self.workdir, "batch.pdf")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def merge(self, parts, is_duplex, separator):
+        processor_module.printer_service.merge_for_batch(parts, self.out, is_duplex=is_duplex, separator=separator)
+        return page_texts(self.out)
+
+    def test_simplex_copies_and_ranges(self):
+        pages = self.merge([(self.a, "3,1", 2, "Job A"), (self.b, None, 1, "Job B")], is_duplex=False, separator=False)
+        self.assertEqual(pages, ["A1", "A3", "A1", "A3", "B1", "B2"])
+
+    def test_duplex_starts_every_copy_and_job_on_a_fresh_sheet(self):
+        pages = self.merge([(self.a, None, 2, "Job A"), (self.b, "2", 1, "Job B")], is_duplex=True, separator=True)
+        self.assertEqual(pages, ["A1", "A2", "A3", "", "A1", "A2", "A3", "", "Job B", "", "B2"])
+
+    def test_collect_batch_splits_on_duplex(self):
+        processor = processor_module.JobProcessor()
+        first, same, duplex, later = context("a"), context("b"), context("c", is_duplex=True), context("d")
+        for ctx in (same, duplex, later):
+            processor.print_stage.queue.put(ctx)
+
+        with mock.patch.object(settings, "BATCH_ENABLED", True):
+            batch, leftover = processor._collect_batch(first)
+        self.assertEqual([ctx.job_id for ctx in batch], ["a", "b"])
+        self.assertIs(leftover, duplex)
+        self.assertIs(processor.print_stage.queue.get_nowait(), later)
+
+    def test_chunked_leftover_is_streamed(self):
+        processor = processor_module.JobProcessor()
+        small, large = context("small"), context("large", pages=150)
+        large.chunked = processor_module.PageSet.parse("1-150", 300)
+        processor.print_stage.queue.put(large)
+
+        with mock.patch.object(settings, "BATCH_ENABLED", True), \
+                mock.patch.object(processor, "_submit") as submit, \
+                mock.patch.object(processor, "_submit_chunked") as submit_chunked:
+            processor._print(small)
+        submit.assert_called_once_with([small])
+        submit_chunked.assert_called_once_with(large)
+
+@unittest.skipIf(processor_module is None, "pycups is not installed")
+class TestPrintHold(unittest.TestCase):
+    """
+    Prepared jobs wait in the print stage, not in CUPS, so the policy still orders them.
+    """
+    def test_print_queue_releases_by_policy(self):
+        with mock.patch.object(settings, "SCHEDULING_POLICY", "sjf"):
+            processor = processor_module.JobProcessor()
+        for ctx in (context("thesis", pages=120), context("ticket"), context("essay", pages=12)):
+            processor.print_stage.queue.put(ctx)
+        released = [processor.print_stage.queue.get_nowait().job_id for _ in range(3)]
+        self.assertEqual(released, ["ticket", "essay", "thesis"])
+
+    def test_gate_holds_while_printers_are_busy(self):
+        processor = processor_module.JobProcessor()
+        pool = processor_module.printer_service.pool
+        with mock.patch.object(settings, "SCHEDULING_HOLD_PAGES", 20), \
+                mock.patch.object(processor_module.printer_service, "mock_mode", False), \
+                mock.patch.object(pool, "refresh"), \
+                mock.patch.object(pool, "shortest_backlog", side_effect=[35, 19, None]):
+            self.assertFalse(processor._printers_have_room())
+            self.assertTrue(processor._printers_have_room())
+            self.assertTrue(processor._printers_have_room())  # nothing online: let submission fail
+
+    def test_wait_is_recorded_when_cups_starts_the_job(self):
+        stats = WaitStats("fifo")
+        tracker = CupsTracker(poll_interval=1, wait_stats=stats)
+        job = Job(id="j", paid_at=datetime.datetime.utcnow() - datetime.timedelta(minutes=5))
+
+        tracker._note_started(job, {"job-state": 3})  # pending behind other jobs
+        self.assertEqual(stats.jobs, 0)
+        tracker._note_started(job, {"job-state": 5})
+        tracker._note_started(job, {"job-state": 9})
+        self.assertEqual(stats.jobs, 1)
+        self.assertGreaterEqual(stats.max_wait, 300)
+
+if __name__ == "__main__":
+    unittest.main()
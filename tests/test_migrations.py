@@ -0,0 +1,139 @@
+import datetime
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from sqlalchemy import and_, create_engine, event, func, inspect, or_, text
+from sqlalchemy.orm import Session
+from core.database import Base
+from core.migrations import MIGRATIONS, run_migrations
+from web.models.models import Job
+
+# jobs as created before any of the later columns existed
+LEGACY_JOBS = """
+CREATE TABLE jobs (
+    id VARCHAR PRIMARY KEY, filename VARCHAR NOT NULL, file_path VARCHAR NOT NULL,
+    page_count INTEGER, copies INTEGER, is_duplex BOOLEAN, status VARCHAR,
+    created_at DATETIME, total_cost FLOAT, razorpay_payment_id VARCHAR, razorpay_order_id VARCHAR
+)
+"""
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+
+    def test_upgrades_legacy_database_keeping_rows(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(LEGACY_JOBS))
+            conn.execute(text("INSERT INTO jobs (id, filename, file_path, status) VALUES ('a', 'a.pdf', 'a.pdf', 'paid')"))
+
+        Base.metadata.create_all(bind=self.engine)
+        self.assertEqual(run_migrations(self.engine), [version for version, _, _ in MIGRATIONS])
+
+        columns = {column["name"] for column in inspect(self.engine).get_columns("jobs")}
+        self.assertTrue({"content_hash", "lease_expires_at", "chunks_total"} <= columns)
+        indexes = {index["name"] for index in inspect(self.engine).get_indexes("jobs")}
+        self.assertTrue({"ix_jobs_status_created_at", "ix_jobs_razorpay_order_id"} <= indexes)
+        with Session(bind=self.engine) as db:
+            job = db.query(Job).filter(Job.id == "a").one()
+            self.assertEqual((job.status, job.chunks_total), ("paid", 0))
+
+    def test_second_run_is_a_no_op(self):
+        Base.metadata.create_all(bind=self.engine)
+        run_migrations(self.engine)
+        self.assertEqual(run_migrations(self.engine), [])
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "new.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_creates_new_database_from_scratch(self):
+        # A fresh interpreter: nothing has imported the models yet, as at server startup
+        script = (
+            "import sys; from sqlalchemy import create_engine; from core.migrations import init_db; "
+            "print(init_db(create_engine(sys.argv[1])))"
+        )
+        result = subprocess.run([sys.executable, "-c", script, f"sqlite:///{self.path}"],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        engine = create_engine(f"sqlite:///{self.path}")
+        try:
+            tables = set(inspect(engine).get_table_names())
+            self.assertTrue({"jobs", "print_chunks", "daily_stats", "schema_migrations"} <= tables)
+            with engine.connect() as conn:
+                versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+            self.assertEqual(versions, [version for version, _, _ in MIGRATIONS])
+        finally:
+            engine.dispose()
+
+class TestHotQueryPlans(unittest.TestCase):
+    """
+    The shapes of the queries run on every poll, payment and dispatch must be
+    served by an index, never by a full scan of jobs.
+    """
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        run_migrations(self.engine)
+        self.db = Session(bind=self.engine)
+        self.now = datetime.datetime.utcnow()
+
+    def tearDown(self):
+        self.db.close()
+
+    def plan(self, query) -> str:
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            return "EXPLAIN QUERY PLAN " + statement, parameters
+        event.listen(self.engine, "before_cursor_execute", explain, retval=True)
+        try:
+            with self.engine.connect() as conn:
+                return " | ".join(row[-1] for row in conn.execute(query.statement))
+        finally:
+            event.remove(self.engine, "before_cursor_execute", explain)
+
+    def assertUsesIndex(self, query, index):
+        plan = self.plan(query)
+        self.assertIn(f"INDEX {index}", plan)
+        self.assertNotRegex(plan, r"SCAN jobs(?! USING)")
+
+    def test_order_lookup(self):
+        # payment page, HTMX poll, webhook
+        self.assertUsesIndex(self.db.query(Job).filter(Job.razorpay_order_id == "order_x"), "ix_jobs_razorpay_order_id")
+
+    def test_latest_job(self):
+        # /status (kiosk poll) and the admin lists
+        self.assertUsesIndex(self.db.query(Job).order_by(Job.created_at.desc()).limit(1), "ix_jobs_created_at")
+
+    def test_claimable_jobs(self):
+        query = self.db.query(Job.id).filter(or_(
+            Job.status == "paid",
+            and_(Job.status == "processing", Job.lease_expires_at < self.now),
+        ))
+        self.assertUsesIndex(query, "ix_jobs_status_created_at")
+
+    def test_in_flight_jobs(self):
+        query = self.db.query(Job).filter(Job.status == "printing", Job.cups_job_id.isnot(None))
+        self.assertUsesIndex(query, "ix_jobs_status_created_at")
+
+    def test_abandoned_window(self):
+        query = self.db.query(Job).filter(
+            Job.status.in_(["uploaded", "payment_pending"]),
+            Job.created_at < self.now,
+            Job.created_at >= self.now - datetime.timedelta(days=1),
+        )
+        self.assertIn("status=? AND created_at>? AND created_at<?", self.plan(query))
+
+    def test_status_count(self):
+        self.assertUsesIndex(self.db.query(func.count(Job.id)).filter(Job.status == "completed"), "ix_jobs_status_created_at")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import fitz
+from core.printing.page_analysis import analyze_pdf
+
+class TestAnalyzePdf(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(tempfile.mkdtemp(), "sample.pdf")
+        doc = fitz.open()
+        doc.new_page()  # blank A4
+        text = doc.new_page()
+        text.insert_text((72, 72), "A single line of ordinary black text on the page")
+        photo = doc.new_page(width=842, height=595)
+        photo.draw_rect(photo.rect, color=(1, 0, 0), fill=(1, 0, 0))
+        numbered = doc.new_page()
+        numbered.insert_text((297, 800), "1", fontsize=9)  # nothing but a page number
+        doc.save(cls.path)
+        doc.close()
+        cls.pages = analyze_pdf(cls.path)
+
+    def test_one_entry_per_page(self):
+        self.assertEqual([p.page_number for p in self.pages], [0, 1, 2, 3])
+
+    def test_dimensions(self):
+        self.assertEqual((self.pages[2].width_pt, self.pages[2].height_pt), (842, 595))
+
+    def test_blank_detection(self):
+        self.assertEqual([p.is_blank for p in self.pages], [True, False, False, False])
+
+    def test_sparse_page_is_not_blank(self):
+        self.assertFalse(self.pages[3].is_blank)
+
+    def test_color_detection(self):
+        self.assertEqual([p.is_color for p in self.pages], [False, False, True, False])
+
+    def test_ink_coverage(self):
+        self.assertEqual(self.pages[0].ink_coverage, 0)
+        self.assertLess(self.pages[1].ink_coverage, 0.05)
+        self.assertGreater(self.pages[2].ink_coverage, 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from core.printing.page_utils import parse_page_range
+from core.printing.page_utils import PageSet, parse_page_range
 
 class TestPageUtils(unittest.TestCase):
     
@@ -52,5 +52,51 @@ class TestPageUtils(unittest.TestCase):
         res = parse_page_range("5-1", 10)
         self.assertEqual(res, [0, 1, 2, 3, 4])
 
+class TestPageSet(unittest.TestCase):
+
+    def test_intervals_are_merged(self):
+        # "1-3, 2-5, 6, 9" -> pages 1-6 and 9
+        pages = PageSet.parse("1-3, 2-5, 6, 9", 10)
+        self.assertEqual(pages.intervals, [(0, 6), (8, 9)])
+        self.assertEqual(len(pages), 7)
+
+    def test_matches_parse_page_range(self):
+        for range_str in ["1, 3-5, 8", "8-12", "5-1", "1, abc, 5", "", "all", "3-5, 4"]:
+            self.assertEqual(list(PageSet.parse(range_str, 10)), parse_page_range(range_str, 10))
+
+    def test_membership(self):
+        pages = PageSet.parse("2-4, 8", 10)
+        self.assertIn(1, pages)
+        self.assertIn(3, pages)
+        self.assertIn(7, pages)
+        self.assertNotIn(0, pages)
+        self.assertNotIn(4, pages)
+        self.assertNotIn(9, pages)
+
+    def test_huge_range_is_cheap(self):
+        # Clipped to the document without materializing ten million pages
+        pages = PageSet.parse("1-10000000", 300)
+        self.assertEqual(len(pages), 300)
+        self.assertTrue(pages.is_all())
+
+    def test_is_all(self):
+        self.assertTrue(PageSet.parse("", 5).is_all())
+        self.assertTrue(PageSet.parse("1-2, 3-5", 5).is_all())
+        self.assertFalse(PageSet.parse("1-4", 5).is_all())
+        self.assertEqual(PageSet.parse("5-1", 5), PageSet.all(5))
+
+    def test_cups_ranges(self):
+        self.assertEqual(PageSet.parse("8, 1-3, 5, 4", 10).to_cups_ranges(), "1-5,8")
+        self.assertEqual(PageSet.parse("50-60", 3).to_cups_ranges(), "")
+
+    def test_split_into_chunks(self):
+        # 7 selected pages in chunks of 3, crossing the gap between intervals
+        chunks = PageSet.parse("1-4, 8-10", 10).split(3)
+        self.assertEqual([c.to_cups_ranges() for c in chunks], ["1-3", "4,8-9", "10"])
+        self.assertEqual([len(c) for c in chunks], [3, 3, 1])
+
+    def test_split_empty(self):
+        self.assertEqual(PageSet.parse("50-60", 3).split(10), [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from core.config import settings
+from core.database import Base
+from core.db_profile import apply_profile, async_url, engine_options
+from web.models.models import Job
+
+try:
+    import cups  # noqa: F401  printer_service connects to CUPS at import
+    import razorpay  # noqa: F401
+    from web.routers import print_settings as router_module
+    from web.services import preconvert as preconvert_module
+except ImportError:
+    router_module = None
+
+@unittest.skipIf(router_module is None, "pycups or razorpay is not installed")
+class TestPricing(unittest.TestCase):
+    """
+    A DOCX carries a placeholder page count of 1 until its conversion finishes.
+    """
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.url = f"sqlite:///{os.path.join(self.workdir, 't.db')}"
+        self.engine = create_engine(self.url, **engine_options(self.url))
+        apply_profile(self.engine)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add(Job(id="j", filename="a.docx", file_path="a.docx", content_hash="h",
+                       status="uploaded", page_count=1, total_pages=1))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.workdir)
+
+    def checkout(self):
+        async def post():
+            async_engine = create_async_engine(async_url(self.url), **engine_options(self.url, poolclass=AsyncAdaptedQueuePool))
+            try:
+                async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                    return await router_module.process_settings(
+                        request=None, file_id="j", copies=2, page_range="", duplex=None, db=db)
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(post())
+
+    def test_timed_out_count_is_not_priced(self):
+        with mock.patch.object(router_module.speculative_converter, "wait", return_value=False), \
+                mock.patch.object(router_module.speculative_converter, "ensure", return_value=True) as ensure, \
+                mock.patch.object(router_module.page_index, "page_count", return_value=None), \
+                mock.patch.object(router_module.conversion_cache, "lookup", return_value=None), \
+                mock.patch.object(router_module.razorpay_service, "create_payment_link") as create_link:
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(response.headers["location"], "/print-settings?file_id=j")
+        ensure.assert_called_once_with("j", "a.docx", "h")
+        create_link.assert_not_called()
+        with self.Session() as db:
+            job = db.get(Job, "j")
+            self.assertEqual((job.status, job.total_cost, job.sheets), ("uploaded", 0, 0))
+
+    def test_late_count_reprices_unpaid_job(self):
+        with self.Session() as db:
+            job = db.get(Job, "j")
+            job.status, job.copies, job.sheets, job.total_cost = "payment_pending", 2, 2, 2 * settings.PRICE_PER_PAGE
+            db.commit()
+
+        entry = SimpleNamespace(page_count=7)
+        with mock.patch.object(preconvert_module, "SessionLocal", self.Session), \
+                mock.patch.object(preconvert_module.conversion_cache, "lookup", return_value=entry):
+            preconvert_module.SpeculativeConverter()._run("j", "a.docx", "h")
+
+        with self.Session() as db:
+            job = db.get(Job, "j")
+            self.assertEqual((job.total_pages, job.sheets), (7, 14))
+            self.assertEqual(job.total_cost, 14 * settings.PRICE_PER_PAGE)
+
+if __name__ == "__main__":
+    unittest.main()
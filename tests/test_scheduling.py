@@ -0,0 +1,79 @@
+import datetime
+import unittest
+from core.printing.scheduling import QueuedJob, SchedulingPolicy, WaitStats, get_policy, job_sheets
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+def minutes_ago(minutes):
+    return NOW - datetime.timedelta(minutes=minutes)
+
+class TestJobSheets(unittest.TestCase):
+
+    def test_simplex(self):
+        # 5 pages x 2 copies
+        self.assertEqual(job_sheets(5, 2, False), 10)
+
+    def test_duplex_rounds_up(self):
+        # 5 pages duplex -> 3 sheets per copy
+        self.assertEqual(job_sheets(5, 2, True), 6)
+
+    def test_missing_values_count_as_one(self):
+        self.assertEqual(job_sheets(0, None, False), 1)
+
+class TestPolicies(unittest.TestCase):
+
+    def setUp(self):
+        self.thesis = QueuedJob("thesis", minutes_ago(10), 300)
+        self.ticket = QueuedJob("ticket", minutes_ago(1), 1)
+        self.form = QueuedJob("form", minutes_ago(5), 2)
+        self.jobs = [self.thesis, self.ticket, self.form]
+
+    def ids(self, policy_name, jobs=None, **kwargs):
+        policy = get_policy(policy_name, **kwargs)
+        return [job.id for job in policy.order(jobs or self.jobs, NOW)]
+
+    def test_fifo_orders_by_ready_time(self):
+        self.assertEqual(self.ids("fifo"), ["thesis", "form", "ticket"])
+
+    def test_sjf_orders_by_sheets(self):
+        self.assertEqual(self.ids("sjf"), ["ticket", "form", "thesis"])
+
+    def test_sjf_ties_break_on_ready_time(self):
+        older = QueuedJob("older", minutes_ago(3), 1)
+        self.assertEqual(self.ids("sjf", [self.ticket, older]), ["older", "ticket"])
+
+    def test_slow_aging_behaves_like_sjf(self):
+        self.assertEqual(self.ids("sjf_aging", aging_rate=0.1), ["ticket", "form", "thesis"])
+
+    def test_aging_prevents_starvation(self):
+        # Waiting 40 min at 10 sheets/min beats a fresh one-page job
+        starved = QueuedJob("thesis", minutes_ago(40), 300)
+        fresh = QueuedJob("ticket", NOW, 1)
+        self.assertEqual(self.ids("sjf_aging", [fresh, starved], aging_rate=10.0), ["thesis", "ticket"])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            get_policy("random")
+
+    def test_policy_name_is_case_insensitive(self):
+        self.assertEqual(get_policy(" SJF ").name, "sjf")
+
+    def test_policy_must_define_priority(self):
+        class Unfinished(SchedulingPolicy):
+            name = "unfinished"
+        with self.assertRaises(TypeError):
+            Unfinished()
+
+class TestWaitStats(unittest.TestCase):
+
+    def test_mean_and_max(self):
+        stats = WaitStats("sjf")
+        stats.record(10)
+        stats.record(30)
+        stats.record(None)  # unknown wait is ignored
+        self.assertEqual(stats.snapshot(), {
+            "policy": "sjf", "jobs": 2, "mean_wait_seconds": 20.0, "max_wait_seconds": 30.0,
+        })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+from web.services.storage_manager import ArtifactGroup, _dir_bytes, plan_evictions
+
+HOUR = 3600
+NOW = 100 * HOUR
+RETENTION = {"completed": 24 * HOUR, "failed": 72 * HOUR, "uploaded": 24 * HOUR, "orphan": 24 * HOUR}
+
+def group(key, status, hours_ago, size=10):
+    return ArtifactGroup(key, None, status, NOW - hours_ago * HOUR, size, [])
+
+def keys(groups):
+    return [g.key for g in groups]
+
+class TestPlanEvictions(unittest.TestCase):
+
+    def test_retention_per_status(self):
+        groups = [group("done", "completed", 30), group("broken", "failed", 30), group("left", "uploaded", 25)]
+        evict = plan_evictions(groups, NOW, 30, 0, RETENTION, min_age=HOUR / 2)
+        self.assertEqual(keys(evict), ["done", "left"])
+
+    def test_active_jobs_never_evicted(self):
+        groups = [group("queued", "paid", 500, size=1000), group("busy", "printing", 500, size=1000)]
+        self.assertEqual(plan_evictions(groups, NOW, 2000, 1, RETENTION, min_age=0), [])
+
+    def test_quota_evicts_least_recently_used(self):
+        groups = [group("new", "completed", 2), group("old", "completed", 10), group("mid", "failed", 5)]
+        evict = plan_evictions(groups, NOW, 30, 15, RETENTION, min_age=HOUR / 2)
+        self.assertEqual(keys(evict), ["old", "mid"])
+
+    def test_quota_spares_recent_files(self):
+        groups = [group("fresh", "uploaded", 0.1)]
+        self.assertEqual(plan_evictions(groups, NOW, 10, 1, RETENTION, min_age=HOUR / 2), [])
+
+    def test_expired_groups_count_towards_quota(self):
+        groups = [group("expired", "completed", 48, size=20), group("recent", "completed", 2)]
+        evict = plan_evictions(groups, NOW, 30, 10, RETENTION, min_age=HOUR / 2)
+        self.assertEqual(keys(evict), ["expired"])
+
+class TestDirBytes(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.partial = os.path.join(self.dir, "partial")
+        os.makedirs(self.partial)
+        for path, size in ((os.path.join(self.dir, "a.pdf"), 100), (os.path.join(self.partial, "b.part"), 40)):
+            with open(path, "wb") as f:
+                f.write(b"x" * size)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_upload_sessions_are_left_out(self):
+        self.assertEqual(_dir_bytes(self.dir), 140)
+        self.assertEqual(_dir_bytes(self.dir, exclude=self.partial), 100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import fitz
+from core.printing.text_layout import MissingGlyphs, decode_text, missing_glyphs, paginate, text_to_pdf, wrap_lines
+from web.services import converters
+
+class TestWrapLines(unittest.TestCase):
+
+    def test_short_lines_untouched(self):
+        self.assertEqual(wrap_lines("hello\nworld", 20), ["hello", "world"])
+
+    def test_blank_lines_kept(self):
+        self.assertEqual(wrap_lines("a\n\nb", 20), ["a", "", "b"])
+
+    def test_wraps_at_spaces(self):
+        self.assertEqual(wrap_lines("the quick brown fox", 10), ["the quick", "brown fox"])
+
+    def test_long_word_is_broken(self):
+        self.assertEqual(wrap_lines("abcdefghij", 4), ["abcd", "efgh", "ij"])
+
+    def test_tabs_expanded_and_crlf(self):
+        self.assertEqual(wrap_lines("a\tb\r\nc", 20), ["a       b", "c"])
+
+    def test_form_feed_marker(self):
+        self.assertEqual(wrap_lines("a\fb", 20), ["a", "\f", "b"])
+
+class TestPaginate(unittest.TestCase):
+
+    def test_fixed_page_size(self):
+        self.assertEqual(paginate(["1", "2", "3"], 2), [["1", "2"], ["3"]])
+
+    def test_form_feed_starts_new_page(self):
+        self.assertEqual(paginate(["a", "\f", "b"], 10), [["a"], ["b"]])
+
+    def test_empty_text_is_one_page(self):
+        self.assertEqual(paginate([], 10), [[]])
+
+class TestDecode(unittest.TestCase):
+
+    def test_utf8_with_bom(self):
+        self.assertEqual(decode_text("\ufeffnaïve".encode("utf-8")), "naïve")
+
+    def test_falls_back_to_cp1252(self):
+        self.assertEqual(decode_text(b"caf\xe9"), "café")
+
+class TestTextToPdf(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write(self, text: str) -> str:
+        path = os.path.join(self.workdir, "note.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_beyond_latin1_is_drawn(self):
+        text = "Привет, κόσμε — “quoted” €5"
+        out = text_to_pdf(self.write(text), os.path.join(self.workdir, "note.pdf"))
+        with fitz.open(out) as doc:
+            self.assertEqual(doc[0].get_text().strip(), text)
+
+    def test_scripts_without_glyphs_are_refused(self):
+        self.assertEqual(missing_glyphs("abc\tмир"), "")
+        self.assertEqual(missing_glyphs("ok 中文, ok 中"), "中文")
+        self.assertTrue(missing_glyphs("മലയാളം"))
+        self.assertTrue(missing_glyphs("हिन्दी"))
+        with self.assertRaises(MissingGlyphs):
+            text_to_pdf(self.write("നമസ്കാരം\n"), os.path.join(self.workdir, "note.pdf"))
+
+    def test_converter_falls_back_to_libreoffice(self):
+        path = self.write("你好，世界\n")
+        output = os.path.join(self.workdir, "note.pdf")
+        with mock.patch.object(converters.office_pool, "convert", return_value=output) as office:
+            self.assertEqual(converters.TextConverter().convert(path, output), output)
+        office.assert_called_once_with(path, output)
+
+if __name__ == '__main__':
+    unittest.main()
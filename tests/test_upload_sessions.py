@@ -0,0 +1,70 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from web.services.upload_sessions import UploadSessionStore
+
+class TestUploadSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = UploadSessionStore(os.path.join(self.dir, "partial"), ttl_hours=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_append_advances_offset(self):
+        session_id = self.store.create("a.pdf", "application/pdf", 6)
+        self.assertEqual(self.store.append(session_id, 0, b"abc"), 3)
+        self.assertEqual(self.store.append(session_id, 3, b"def"), 6)
+        self.assertEqual(self.store.get(session_id)["offset"], 6)
+
+    def test_wrong_offset_writes_nothing(self):
+        session_id = self.store.create("a.pdf", "application/pdf", 6)
+        self.store.append(session_id, 0, b"abc")
+        self.assertIsNone(self.store.append(session_id, 0, b"abc"))
+        self.assertEqual(self.store.get(session_id)["offset"], 3)
+
+    def test_sessions_append_independently(self):
+        slow = self.store.create("a.pdf", "application/pdf", 6)
+        other = self.store.create("b.pdf", "application/pdf", 3)
+        with self.store._session_lock(slow):  # a chunk of slow is being written
+            done = []
+            writer = threading.Thread(target=lambda: done.append(self.store.append(other, 0, b"abc")))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertEqual(done, [3])
+
+    def test_finish_moves_file_and_hashes(self):
+        session_id = self.store.create("a.pdf", "application/pdf", 6)
+        self.store.append(session_id, 0, b"abc")
+        self.store.append(session_id, 3, b"def")
+        dest = os.path.join(self.dir, "a.pdf")
+        self.assertEqual(self.store.finish(session_id, dest), hashlib.sha256(b"abcdef").hexdigest())
+        self.assertEqual(open(dest, "rb").read(), b"abcdef")
+        self.assertIsNone(self.store.get(session_id))
+
+    def test_finish_after_restart_rehashes(self):
+        session_id = self.store.create("a.pdf", "application/pdf", 6)
+        self.store.append(session_id, 0, b"abc")
+        restarted = UploadSessionStore(self.store.session_dir, ttl_hours=1)
+        restarted.append(session_id, 3, b"def")
+        dest = os.path.join(self.dir, "a.pdf")
+        self.assertEqual(restarted.finish(session_id, dest), hashlib.sha256(b"abcdef").hexdigest())
+
+    def test_unknown_or_malformed_session(self):
+        self.assertIsNone(self.store.get("0" * 32))
+        self.assertIsNone(self.store.get("../../etc/passwd"))
+
+    def test_sweep_removes_idle_sessions(self):
+        stale = self.store.create("a.pdf", "application/pdf", 6)
+        fresh = self.store.create("b.pdf", "application/pdf", 6)
+        os.utime(os.path.join(self.store.session_dir, f"{stale}.part"), (0, 0))
+        self.store.sweep_stale()
+        self.assertIsNone(self.store.get(stale))
+        self.assertIsNotNone(self.store.get(fresh))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,21 +4,31 @@ load_dotenv()
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from core.database import engine, Base
+from core.database import async_engine, engine, checkpoint_scheduler
 from sqlalchemy import text
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables, then bring existing ones up to date
+from core.migrations import init_db
+init_db(engine)
 
 from contextlib import asynccontextmanager
 from web.services.job_worker import start_worker
+from web.services.office_converter import office_pool
+from web.services.loop_monitor import loop_monitor
+from web.services.storage_manager import storage_manager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start worker
+    # Startup: Start worker, warm up LibreOffice in the background
     start_worker()
+    office_pool.start()
+    loop_monitor.start()
+    storage_manager.start()
+    checkpoint_scheduler.start()
     yield
     # Shutdown: Clean up if needed
+    office_pool.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(title="PrintBot API", lifespan=lifespan)
 
@@ -43,13 +53,14 @@ os.makedirs("web/static", exist_ok=True)
 # Mount static files
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 
-from web.routers import upload, print_settings, status, admin, webhooks
+from web.routers import upload, print_settings, status, admin, webhooks, preview
 
 app.include_router(upload.router)
 app.include_router(print_settings.router)
 app.include_router(status.router)
 app.include_router(admin.router)
 app.include_router(webhooks.router)
+app.include_router(preview.router)
 
 
 
@@ -74,8 +85,21 @@ def health_check():
         printers = printer_service.conn.getPrinters()
         health_status["components"]["cups"] = "up"
         health_status["components"]["printers_found"] = len(printers)
+        printer_service.pool.refresh(printer_service.conn)
+        health_status["components"]["printer_pool"] = printer_service.pool.status()
     except Exception as e:
         health_status["status"] = "degraded"
         health_status["components"]["cups"] = f"down: {str(e)}"
 
+    # 3. Print Pipeline (queue depth and timing per stage)
+    from web.services.job_processor import job_processor
+    health_status["components"]["pipeline"] = job_processor.stats()
+
+    # 4. Conversion cost per converter (pdf / image / text / office)
+    from web.services.converters import converter_registry
+    health_status["components"]["converters"] = converter_registry.stats()
+
+    # 5. Event-loop lag (blocking work in async handlers shows up here)
+    health_status["components"]["event_loop"] = loop_monitor.stats()
+
     return health_status
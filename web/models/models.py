@@ -1,9 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, CheckConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, CheckConstraint, Index
 from sqlalchemy.sql import func
 from core.database import Base
 
+# Statuses of a job that has not been paid (yet)
+UNPAID_STATUSES = ["uploaded", "payment_pending"]
+# Statuses a job can be in once paid, whatever happened at the printer since
+PAID_STATUSES = ["paid", "processing", "printing", "completed"]
+
 class Job(Base):
     __tablename__ = "jobs"
+    # Existing databases get these through core/migrations.py
+    __table_args__ = (
+        Index("ix_jobs_status_created_at", "status", "created_at"), # also serves status-only filters
+        Index("ix_jobs_created_at", "created_at"), # newest-first lists (/status, admin)
+        Index("ix_jobs_razorpay_order_id", "razorpay_order_id"), # payment page, HTMX poll, webhook
+    )
 
     id = Column(String, primary_key=True, index=True) # UUID
     filename = Column(String, nullable=False)
@@ -18,6 +29,56 @@ class Job(Base):
     total_cost = Column(Float, default=0.0)
     razorpay_payment_id = Column(String, nullable=True)
     razorpay_order_id = Column(String, nullable=True)
+    paid_at = Column(DateTime, nullable=True) # UTC, set when payment is confirmed
+    content_hash = Column(String, nullable=True) # sha256 of the uploaded bytes
+    worker_id = Column(String, nullable=True) # "host:pid" of the worker holding the job
+    lease_expires_at = Column(DateTime, nullable=True) # claim is void after this (UTC)
+    cups_job_id = Column(Integer, nullable=True) # set once spooled to CUPS
+    pages_printed = Column(Integer, default=0) # progress reported by CUPS
+    chunks_total = Column(Integer, default=0) # >0 when streamed to CUPS as ordered sub-jobs
+    sheets = Column(Integer, default=0) # physical sheets priced at checkout
+
+class PrintChunk(Base):
+    __tablename__ = "print_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, nullable=False, index=True) # parent Job
+    seq = Column(Integer, nullable=False) # submission order, from 0
+    cups_job_id = Column(Integer, nullable=True)
+    pages = Column(Integer, default=0)
+    pages_printed = Column(Integer, default=0)
+    status = Column(String, default="printing") # printing, completed, failed
+
+class DailyStat(Base):
+    __tablename__ = "daily_stats"
+    # Maintained by SQLite triggers on jobs (core/daily_stats.py), never written directly
+
+    day = Column(Date, primary_key=True) # UTC day the job was created
+    status = Column(String, primary_key=True) # the job's current status
+    jobs = Column(Integer, nullable=False, default=0)
+    sheets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+class ConversionCacheEntry(Base):
+    __tablename__ = "conversion_cache"
+
+    content_hash = Column(String, primary_key=True) # sha256 of the source upload
+    pdf_path = Column(String, nullable=False)
+    page_count = Column(Integer, default=0)
+    size_bytes = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PageMetadata(Base):
+    __tablename__ = "page_metadata"
+
+    content_hash = Column(String, primary_key=True) # same key as conversion_cache
+    page_number = Column(Integer, primary_key=True) # 0-based
+    width_pt = Column(Float, default=0.0)
+    height_pt = Column(Float, default=0.0)
+    ink_coverage = Column(Float, default=0.0) # mean darkness, 0..1
+    is_blank = Column(Boolean, default=False)
+    is_color = Column(Boolean, default=False)
 
 class PricingRule(Base):
     __tablename__ = "pricing_rules"
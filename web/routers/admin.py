@@ -4,15 +4,19 @@ from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from core.database import get_db
-from web.models.models import Job, PricingRule
+from web.models.models import DailyStat, Job, PricingRule, PAID_STATUSES
 from core.config import settings
+from web.services.storage_manager import storage_manager
 import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 templates = Jinja2Templates(directory="web/templates")
 
 templates = Jinja2Templates(directory="web/templates")
 
+STATS_MAX_DAYS = 366
+
 @router.get("/", include_in_schema=False)
 def admin_root_redirect():
     return RedirectResponse(url="/admin/login") 
@@ -64,18 +68,12 @@ def dashboard(request: Request, user: str = Depends(get_current_user), db: Sessi
     if not user:
         return RedirectResponse(url="/admin/login")
     
-    # Stats
-    total_jobs = db.query(Job).count()
-    completed_jobs = db.query(Job).filter(Job.status == "completed").count()
-    failed_jobs = db.query(Job).filter(Job.status.contains("failed")).count()
-    
-    # Calculate total revenue from completed/paid jobs
-    # Assuming 'paid' jobs also count towards revenue even if they failed printing later, 
-    # but strictly 'paid' status is most accurate for money collected.
-    # Job doesn't have a 'paid_amount' field directly accessible easily without joining Payment, 
-    # but we added total_cost column to Job in Agent 1.
-    revenue_query = db.query(func.sum(Job.total_cost)).filter(Job.status.in_(["paid", "processing", "printing", "completed"])).scalar()
-    total_revenue = revenue_query if revenue_query else 0.0
+    # Stats: one read of the daily_stats rollup instead of a scan of jobs per figure
+    totals = db.query(DailyStat.status, func.sum(DailyStat.jobs), func.sum(DailyStat.revenue)).group_by(DailyStat.status).all()
+    total_jobs = sum(jobs for _, jobs, _ in totals)
+    completed_jobs = sum(jobs for status, jobs, _ in totals if status == "completed")
+    failed_jobs = sum(jobs for status, jobs, _ in totals if status and "failed" in status)
+    total_revenue = sum(revenue for status, _, revenue in totals if status in PAID_STATUSES)
 
     # Recent Jobs
     recent_jobs = db.query(Job).order_by(Job.created_at.desc()).limit(10).all()
@@ -87,39 +85,47 @@ def dashboard(request: Request, user: str = Depends(get_current_user), db: Sessi
         "failed_jobs": failed_jobs,
         "total_revenue": total_revenue,
         "price_per_page": settings.PRICE_PER_PAGE,
-        "recent_jobs": recent_jobs
+        "recent_jobs": recent_jobs,
+        "storage": storage_manager.usage()
     })
 
 @router.get("/api/stats")
-def get_stats(user: str = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_stats(start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+              user: str = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Per-day revenue, jobs and sheets for start..end inclusive (UTC days,
+    default the last 7), from a single range read of daily_stats.
+    """
     if not user: raise HTTPException(status_code=401)
-    
-    # Last 7 days chart data
-    today = datetime.date.today()
-    dates = []
-    revenues = []
-    
-    for i in range(6, -1, -1):
-        d = today - datetime.timedelta(days=i)
-        # SQLite date handling can be tricky, using simple string match or range if datetime stored correctly.
-        # Job.created_at is DateTime.
-        # We'll do a rough python-side aggregation for simplicity if SQL is complex.
-        # Actually, let's just mock specific day query or do basic.
-        
-        # Simple/Naive: Fetch all jobs for that day
-        start_dt = datetime.datetime.combine(d, datetime.time.min)
-        end_dt = datetime.datetime.combine(d, datetime.time.max)
-        
-        day_rev = db.query(func.sum(Job.total_cost)).filter(
-            Job.created_at >= start_dt,
-            Job.created_at <= end_dt,
-            Job.status.in_(["paid", "processing", "printing", "completed"])
-        ).scalar()
-        
-        dates.append(d.strftime("%Y-%m-%d"))
-        revenues.append(day_rev if day_rev else 0.0)
-        
-    return {"labels": dates, "data": revenues}
+
+    end = end or datetime.datetime.utcnow().date()
+    start = start or end - datetime.timedelta(days=6)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= STATS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"range is limited to {STATS_MAX_DAYS} days")
+
+    rows = db.query(DailyStat).filter(DailyStat.day.between(start, end)).all()
+
+    days = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    revenues = {day: 0.0 for day in days}
+    jobs = {day: 0 for day in days}
+    sheets = {day: 0 for day in days}
+    by_status = {}
+    for row in rows:
+        jobs[row.day] += row.jobs
+        by_status[row.status] = by_status.get(row.status, 0) + row.jobs
+        if row.status in PAID_STATUSES:
+            revenues[row.day] += row.revenue
+            sheets[row.day] += row.sheets
+
+    return {
+        "labels": [day.strftime("%Y-%m-%d") for day in days],
+        "data": [revenues[day] for day in days],
+        "jobs": [jobs[day] for day in days],
+        "sheets": [sheets[day] for day in days],
+        "by_status": by_status,
+    }
 
 @router.post("/api/pricing")
 def update_pricing(price: float = Form(...), user: str = Depends(get_current_user)):
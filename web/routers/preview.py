@@ -0,0 +1,50 @@
+import asyncio
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_async_db
+from web.models.models import Job
+from web.services.conversion_cache import conversion_cache
+from web.services.preconvert import speculative_converter
+from web.services.thumbnails import thumbnail_service
+
+router = APIRouter()
+
+# Content-addressed: a job's page image never changes, so browsers may keep it
+CACHE_CONTROL = "private, max-age=86400, immutable"
+
+@router.get("/preview/{job_id}/{page}")
+async def page_preview(request: Request, job_id: str, page: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    JPEG thumbnail of one page (1-based) of an uploaded document.
+    """
+    job = await db.get(Job, job_id)
+    if not job or not job.content_hash:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    width = settings.THUMBNAIL_WIDTH
+    etag = thumbnail_service.etag(job.content_hash, page - 1, width)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    entry = await run_in_threadpool(conversion_cache.lookup, job.content_hash)
+    if not entry:
+        # DOCX/images: the PDF appears once the speculative conversion finishes
+        await run_in_threadpool(speculative_converter.wait, job_id, settings.PRECONVERT_PRICING_WAIT)
+        entry = await run_in_threadpool(conversion_cache.lookup, job.content_hash)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Preview not available yet")
+    if page < 1 or page > entry.page_count:
+        raise HTTPException(status_code=404, detail="Page out of range")
+
+    # A cache hit reads the file right away; keep that disk I/O off the event loop
+    future = await run_in_threadpool(thumbnail_service.request, job.content_hash, entry.pdf_path, page - 1, width)
+    try:
+        image = await asyncio.wrap_future(future)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Preview rendering failed")
+    return Response(content=image, media_type="image/jpeg", headers=headers)
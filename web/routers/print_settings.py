@@ -1,30 +1,58 @@
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from core.database import get_db, SessionLocal
-from web.models.models import Job
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from web.models.models import Job, PAID_STATUSES
 from core.config import settings as config_settings
 from web.services.razorpay_service import razorpay_service
+from web.services.preconvert import speculative_converter
+from web.services.page_index import page_index
+from web.services.conversion_cache import conversion_cache
+from core.printing.page_utils import PageSet
+from core.printing.scheduling import job_sheets
 import uuid
 
 router = APIRouter()
+
+# Thumbnails shown on the settings page; the rest is reachable by page range only
+PREVIEW_PAGES = 24
 templates = Jinja2Templates(directory="web/templates")
 
+async def counted_pages(job: Job):
+    """
+    The job's real page count, or None while it is still being counted. DOCX and
+    text uploads carry a placeholder count of 1 until their conversion finishes.
+    """
+    if not job.content_hash:
+        return job.page_count  # jobs from before content hashing
+    # Index first: counted once, never reparsed
+    count = await run_in_threadpool(page_index.page_count, job.content_hash)
+    if count:
+        return count
+    entry = await run_in_threadpool(conversion_cache.lookup, job.content_hash)
+    return entry.page_count if entry else None
+
 @router.get("/print-settings", response_class=HTMLResponse)
-async def print_settings_page(request: Request, file_id: str):
+async def print_settings_page(request: Request, file_id: str, db: AsyncSession = Depends(get_async_db)):
     # Retrieve job info (or just pass basic info if DB is partial)
     # Ideally fetch job from DB to get estimated page count
-    db = SessionLocal()
-    job = db.query(Job).filter(Job.id == file_id).first()
-    db.close()
+    job = await db.get(Job, file_id)
     
-    total_pages = job.total_pages if job else 1
+    total_pages = (await counted_pages(job) if job else 1)
+    counting = total_pages is None
+    total_pages = total_pages or 1
+    page_summary = await run_in_threadpool(page_index.summary, job.content_hash) if job and not counting else {}
     
     return templates.TemplateResponse("settings.html", {
         "request": request,
         "file_id": file_id,
         "total_pages": total_pages,
+        "counting": counting,
+        "page_summary": page_summary,
+        "preview_pages": 0 if counting else min(total_pages, PREVIEW_PAGES),
         "price_per_page": config_settings.PRICE_PER_PAGE
     })
 
@@ -35,26 +63,28 @@ async def process_settings(
     copies: int = Form(...),
     page_range: str = Form(""),
     duplex: str = Form(None), # Checkbox sends 'on' or None
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    job = db.query(Job).filter(Job.id == file_id).first()
+    # DOCX/image page counts arrive from the speculative conversion; price on the real count
+    await run_in_threadpool(speculative_converter.wait, file_id, config_settings.PRECONVERT_PRICING_WAIT)
+
+    job = await db.get(Job, file_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-        
-    # Logic to parse page range and count actual pages
-    from core.printing.page_utils import parse_page_range
-    pages_list = parse_page_range(page_range, job.page_count) # job.page_count (from upload) not total_pages (might be wrong attr name)
-    actual_pages = len(pages_list)
+
+    total_pages = await counted_pages(job)
+    if total_pages is None:
+        # Still converting (one preconvert worker serves every upload): never price a placeholder
+        if not await run_in_threadpool(speculative_converter.ensure, job.id, job.file_path, job.content_hash):
+            raise HTTPException(status_code=422, detail="This document could not be read")
+        return RedirectResponse(url=f"/print-settings?file_id={file_id}", status_code=303)
+
+    # Interval count only: pricing "1-10000000" costs nothing
+    actual_pages = len(PageSet.parse(page_range, total_pages))
     
     is_duplex_bool = True if duplex == 'on' else False
     
-    # Calculate sheets
-    sheets = actual_pages
-    if is_duplex_bool:
-        import math
-        sheets = math.ceil(actual_pages / 2)
-        
-    total_sheets = sheets * copies
+    total_sheets = job_sheets(actual_pages, copies, is_duplex_bool)
     amount = total_sheets * config_settings.PRICE_PER_PAGE
     
     # Create Razorpay Order/Link
@@ -64,7 +94,9 @@ async def process_settings(
     
     if razorpay_service.enabled:
         try:
-            link_data = razorpay_service.create_payment_link(
+            # An HTTPS round trip to Razorpay: keep it off the event loop
+            link_data = await run_in_threadpool(
+                razorpay_service.create_payment_link,
                 amount=amount,
                 description=f"Print Job {file_id}",
                 reference_id=order_id
@@ -87,9 +119,10 @@ async def process_settings(
     job.page_range = page_range
     job.is_duplex = is_duplex_bool
     job.total_cost = amount
+    job.sheets = total_sheets
     job.razorpay_order_id = order_id
     job.status = "payment_pending"
-    db.commit()
+    await db.commit()
     
     # Redirect to payment page
     import urllib.parse
@@ -101,8 +134,8 @@ async def process_settings(
     return RedirectResponse(url=redirect_url, status_code=303)
 
 @router.get("/payment/{order_id}", response_class=HTMLResponse)
-async def payment_page(request: Request, order_id: str, payment_link: str = None, db: Session = Depends(get_db)):
-    job = db.query(Job).filter(Job.razorpay_order_id == order_id).first()
+async def payment_page(request: Request, order_id: str, payment_link: str = None, db: AsyncSession = Depends(get_async_db)):
+    job = (await db.execute(select(Job).where(Job.razorpay_order_id == order_id).limit(1))).scalar()
     if not job:
         raise HTTPException(status_code=404, detail="Order not found")
         
@@ -123,11 +156,12 @@ async def payment_page(request: Request, order_id: str, payment_link: str = None
     })
 
 @router.get("/payment-status/{order_id}")
-async def check_payment_status(order_id: str, db: Session = Depends(get_db)):
+async def check_payment_status(order_id: str, db: AsyncSession = Depends(get_async_db)):
     # This endpoint is polled by HTMX
-    job = db.query(Job).filter(Job.razorpay_order_id == order_id).first()
+    status = (await db.execute(select(Job.status).where(Job.razorpay_order_id == order_id).limit(1))).scalar()
     
-    if job and job.status == "paid":
+    # The worker usually claims a paid job before the next poll sees "paid"
+    if status in PAID_STATUSES:
         # HTMX Redirect
         response = HTMLResponse()
         response.headers["HX-Redirect"] = "/success"
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends
-from core.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
 from web.models.models import Job
 
 router = APIRouter()
 
 @router.get("/status")
-def get_machine_status(db: Session = Depends(get_db)):
+async def get_machine_status(db: AsyncSession = Depends(get_async_db)):
     # Get latest active job
-    latest_job = db.query(Job).order_by(Job.created_at.desc()).first()
+    latest_job = (await db.execute(select(Job).order_by(Job.created_at.desc()).limit(1))).scalar()
     
     status_text = "ready"
     state_code = "idle"
@@ -16,6 +17,8 @@ def get_machine_status(db: Session = Depends(get_db)):
     if latest_job:
         if latest_job.status == "printing":
             status_text = f"Printing Job #{latest_job.id}"
+            if latest_job.pages_printed:
+                status_text += f" ({latest_job.pages_printed} pages done)"
             state_code = "printing"
         elif latest_job.status == "payment_pending":
             status_text = "Waiting for Payment"
@@ -23,7 +26,7 @@ def get_machine_status(db: Session = Depends(get_db)):
         elif latest_job.status == "uploaded":
             status_text = "File Uploaded. configuring..."
             state_code = "uploading"
-        elif latest_job.status == "paid":
+        elif latest_job.status in ["paid", "processing"]:
              status_text = "Processing Job..."
              state_code = "printing"
     
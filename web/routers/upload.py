@@ -1,86 +1,185 @@
-from fastapi import APIRouter, UploadFile, File, Request, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from core.database import get_db
+from starlette.requests import ClientDisconnect
+from core.config import settings
+from core.database import SessionLocal
+from core.printing.images import IMAGE_SET_EXT, write_image_set
 from web.models.models import Job
-import shutil
+from web.services.conversion_cache import conversion_cache
+from web.services.converters import sniff_type
+from web.services.preconvert import speculative_converter
+from web.services.upload_sessions import upload_sessions
+import hashlib
 import os
 import uuid
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
 
-UPLOAD_DIR = "uploads"
+UPLOAD_DIR = settings.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+IMAGE_TYPES = ["image/jpeg", "image/png"]
+
+# What the first bytes of each accepted upload type must sniff as
+EXPECTED_TYPES = {
+    "application/pdf": "pdf",
+    "image/jpeg": "image",
+    "image/png": "image",
+    "text/plain": "text",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "office",
+}
+
+MAX_SIZE = 90 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
 @router.get("/")
 def get_upload_page(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
-import fitz  # PyMuPDF
+def _ingest_chunk(buffer, hasher, chunk: bytes):
+    # Threadpool side of the stream: hashlib drops the GIL for big buffers and the write never stalls the loop
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+def _content_matches(head: bytes, content_type: str) -> bool:
+    # Type from the bytes themselves, not the browser's label or the
+    # extension; only plain text has no magic number to check
+    hint = ".txt" if content_type == "text/plain" else ""
+    return sniff_type(head[:8], hint) == EXPECTED_TYPES[content_type]
+
+def _discard(paths: list):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _register_upload(file_path: str, file_ext: str, display_name: str, content_hash: str, photo_count: int):
+    """
+    Blocking half of an upload (page counting, DB writes), run in the threadpool.
+    Returns (job_id, needs_conversion).
+    """
+    # 4. Accurate Page Counting
+    page_count = 1
+    needs_conversion = False
+    try:
+        cached = conversion_cache.lookup(content_hash)
+        if cached:
+            # Seen this exact file before: conversion already done
+            page_count = cached.page_count
+        elif file_ext == ".pdf":
+            page_count = conversion_cache.store(content_hash, file_path).page_count
+        else:
+            # DOCX/TXT: 1 until the speculative conversion reports back; photos are a page each
+            needs_conversion = True
+            if photo_count:
+                page_count = photo_count
+    except Exception as e:
+        print(f"Page count error: {e}")
+        # Fallback to 1, don't fail upload just for this
+        page_count = 1
+
+    db: Session = SessionLocal()
+    try:
+        new_job = Job(
+            id=str(uuid.uuid4()),
+            filename=display_name,
+            file_path=file_path,
+            page_count=page_count,
+            total_pages=page_count,
+            content_hash=content_hash,
+            status="uploaded"
+        )
+        db.add(new_job)
+        db.commit()
+        return new_job.id, needs_conversion
+    finally:
+        db.close()
 
 @router.post("/upload")
-async def upload_file(request: Request, file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_file(request: Request, file: List[UploadFile] = File(...)):
+    """
+    Streams the upload to disk without blocking the event loop: every chunk is
+    hashed and written in the threadpool, the file type is sniffed from the first
+    chunk, and page counting plus DB writes run in the threadpool as well.
+    """
     try:
         # 1. Validate file type
-        allowed_types = ["application/pdf", "image/jpeg", "image/png", 
-                        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
-        
-        if file.content_type not in allowed_types:
-             return templates.TemplateResponse("index.html", {"request": request, "error": "Invalid file type. Only PDF, JPG, PNG, DOCX allowed."})
+        files = file
+        if any(f.content_type not in EXPECTED_TYPES for f in files):
+             return templates.TemplateResponse("index.html", {"request": request, "error": "Invalid file type. Only PDF, JPG, PNG, DOCX, TXT allowed."})
+        # Several files make one job only when they are all photos
+        if len(files) > 1 and any(f.content_type not in IMAGE_TYPES for f in files):
+             return templates.TemplateResponse("index.html", {"request": request, "error": "Multiple files are only supported for photos (JPG, PNG)."})
 
         # 2. Validate Size (90MB Limit)
-        MAX_SIZE = 90 * 1024 * 1024
         # Check size if content-length header is present (fast fail)
         if request.headers.get('content-length') and int(request.headers.get('content-length')) > MAX_SIZE:
              return templates.TemplateResponse("index.html", {"request": request, "error": "File too large (Max 90MB)"})
         
-        # 3. Save file safely
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
+        # 3. Save file(s) safely
         # Read and write chunks to avoid memory spikes, and check size while writing
+        # Hash as we go so duplicate uploads can reuse a cached conversion
         size = 0
-        with open(file_path, "wb") as buffer:
-            while True:
-                chunk = await file.read(1024 * 1024) # 1MB chunks
-                if not chunk:
-                    break
-                size += len(chunk)
-                if size > MAX_SIZE:
-                    os.remove(file_path) # Clean up partial
-                    return templates.TemplateResponse("index.html", {"request": request, "error": "File too large (Max 90MB)"})
-                buffer.write(chunk)
-            
-        # 4. Accurate Page Counting
-        page_count = 1
-        try:
-            if file_ext == ".pdf":
-                doc = fitz.open(file_path)
-                page_count = doc.page_count
-                doc.close()
-            # Images and DOCX default to 1 for now (DOCX calculated after conversion)
-        except Exception as e:
-            print(f"Page count error: {e}")
-            # Fallback to 1, don't fail upload just for this
-            page_count = 1
+        hasher = hashlib.sha256()
+        saved_paths = []
+        for upload in files:
+            file_ext = os.path.splitext(upload.filename)[1].lower()
+            unique_filename = f"{uuid.uuid4()}{file_ext}"
+            file_path = os.path.join(UPLOAD_DIR, unique_filename)
+            saved_paths.append(file_path)
+            buffer = await run_in_threadpool(open, file_path, "wb")
+            error = None
+            try:
+                first_chunk = True
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if first_chunk:
+                        first_chunk = False
+                        if not _content_matches(chunk, upload.content_type):
+                            error = "File content does not match its type. Only PDF, JPG, PNG, DOCX, TXT allowed."
+                            break
+                    size += len(chunk)
+                    if size > MAX_SIZE:
+                        error = "File too large (Max 90MB)"
+                        break
+                    await run_in_threadpool(_ingest_chunk, buffer, hasher, chunk)
+            finally:
+                await run_in_threadpool(buffer.close)
+            if error:
+                await run_in_threadpool(_discard, saved_paths) # Clean up partial
+                return templates.TemplateResponse("index.html", {"request": request, "error": error})
 
-        new_job = Job(
-            id=str(uuid.uuid4()),
-            filename=file.filename,
-            file_path=file_path,
-            page_count=page_count,
-            status="uploaded"
+        display_name = files[0].filename
+        if len(files) > 1:
+            # One job, one page per photo, in upload order
+            hasher.update(IMAGE_SET_EXT.encode())
+            file_ext = IMAGE_SET_EXT
+            file_path = await run_in_threadpool(
+                write_image_set, os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}{IMAGE_SET_EXT}"), saved_paths
+            )
+            display_name = f"{files[0].filename} (+{len(files) - 1} photos)"
+
+        content_hash = hasher.hexdigest()
+        photo_count = len(saved_paths) if files[0].content_type in IMAGE_TYPES else 0
+        job_id, needs_conversion = await run_in_threadpool(
+            _register_upload, file_path, file_ext, display_name, content_hash, photo_count
         )
-        db.add(new_job)
-        db.commit()
-        db.refresh(new_job)
+
+        # Convert while the user is still on the settings/payment pages
+        if needs_conversion:
+            speculative_converter.submit(job_id, file_path, content_hash)
         
         # Redirect to settings page
         return RedirectResponse(
-            url=f"/print-settings?file_id={new_job.id}", 
+            url=f"/print-settings?file_id={job_id}", 
             status_code=303
         )
 
@@ -88,3 +187,121 @@ async def upload_file(request: Request, file: UploadFile = File(...), db: Sessio
         print(f"Upload Error: {e}")
         return templates.TemplateResponse("index.html", {"request": request, "error": "System Error during upload. Please try again."})
 
+# Resumable uploads (tus-style), used by the upload page for single files so a
+# dropped mobile connection resumes where it stopped instead of starting over:
+#   POST  /upload/sessions              {filename, content_type, size} -> session
+#   HEAD  /upload/sessions/{id}         current Upload-Offset
+#   PATCH /upload/sessions/{id}         raw bytes appended at Upload-Offset
+#   POST  /upload/sessions/{id}/finish  -> Job
+
+def _session_headers(session_id: str, session: dict) -> dict:
+    return {
+        "Location": f"/upload/sessions/{session_id}",
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store",
+    }
+
+@router.post("/upload/sessions")
+async def create_upload_session(request: Request):
+    try:
+        body = await request.json()
+        filename = str(body["filename"])
+        content_type = str(body["content_type"])
+        length = int(body["size"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="filename, content_type and size are required")
+    if content_type not in EXPECTED_TYPES:
+        raise HTTPException(status_code=415, detail="Invalid file type. Only PDF, JPG, PNG, DOCX, TXT allowed.")
+    if length <= 0 or length > MAX_SIZE:
+        raise HTTPException(status_code=413, detail="File too large (Max 90MB)")
+
+    session_id = await run_in_threadpool(upload_sessions.create, filename, content_type, length)
+    session = {"offset": 0, "length": length}
+    return JSONResponse(
+        status_code=201,
+        content={"id": session_id, **session},
+        headers=_session_headers(session_id, session),
+    )
+
+@router.head("/upload/sessions/{session_id}")
+async def upload_session_offset(session_id: str):
+    session = await run_in_threadpool(upload_sessions.get, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return Response(status_code=200, headers=_session_headers(session_id, session))
+
+@router.patch("/upload/sessions/{session_id}")
+async def append_upload_session(request: Request, session_id: str):
+    """
+    Appends the request body at Upload-Offset. Whatever arrived before a
+    disconnect is kept; the client asks for the offset (HEAD) and resumes.
+    """
+    session = await run_in_threadpool(upload_sessions.get, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header required")
+    if offset != session["offset"]:
+        raise HTTPException(status_code=409, detail="Offset mismatch", headers=_session_headers(session_id, session))
+
+    pending = bytearray()
+
+    async def flush():
+        nonlocal offset
+        data = bytes(pending)
+        pending.clear()
+        if offset == 0 and len(data) < min(8, session["length"]):
+            return  # too little to check the type; the client resends from 0
+        if offset == 0 and not _content_matches(data, session["content_type"]):
+            await run_in_threadpool(upload_sessions.discard, session_id)
+            raise HTTPException(status_code=415, detail="File content does not match its type.")
+        if offset + len(data) > session["length"]:
+            raise HTTPException(status_code=413, detail="More data than the declared size")
+        new_offset = await run_in_threadpool(upload_sessions.append, session_id, offset, data)
+        if new_offset is None:
+            # Another request for this session got there first
+            current = await run_in_threadpool(upload_sessions.get, session_id)
+            raise HTTPException(status_code=409, detail="Offset mismatch", headers=_session_headers(session_id, current))
+        offset = new_offset
+
+    try:
+        async for piece in request.stream():
+            pending += piece
+            if len(pending) >= CHUNK_SIZE:
+                await flush()
+    except ClientDisconnect:
+        if pending:
+            await flush()
+        return Response(status_code=204)
+    if pending:
+        await flush()
+
+    session["offset"] = offset
+    return Response(status_code=204, headers=_session_headers(session_id, session))
+
+@router.post("/upload/sessions/{session_id}/finish")
+async def finish_upload_session(session_id: str):
+    session = await run_in_threadpool(upload_sessions.get, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session["offset"] != session["length"]:
+        raise HTTPException(status_code=409, detail="Upload incomplete", headers=_session_headers(session_id, session))
+
+    file_ext = os.path.splitext(session["filename"])[1].lower()
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}{file_ext}")
+    try:
+        content_hash = await run_in_threadpool(upload_sessions.finish, session_id, file_path)
+    except FileNotFoundError:
+        # Finished by a concurrent request
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    photo_count = 1 if session["content_type"] in IMAGE_TYPES else 0
+    job_id, needs_conversion = await run_in_threadpool(
+        _register_upload, file_path, file_ext, session["filename"], content_hash, photo_count
+    )
+    if needs_conversion:
+        speculative_converter.submit(job_id, file_path, content_hash)
+    return {"job_id": job_id, "redirect": f"/print-settings?file_id={job_id}"}
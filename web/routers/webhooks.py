@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Request, Header, HTTPException, Depends
-from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
 from web.models.models import Job
 from web.services.razorpay_service import razorpay_service
+from web.services.job_dispatcher import job_dispatcher
+import datetime
 import json
 
 router = APIRouter(prefix="/webhooks", tags=["payment"])
@@ -11,7 +14,7 @@ router = APIRouter(prefix="/webhooks", tags=["payment"])
 async def razorpay_webhook(
     request: Request, 
     x_razorpay_signature: str = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle Razorpay Webhooks (payment.captured, payment.failed).
@@ -38,12 +41,14 @@ async def razorpay_webhook(
             # payment_id = pl_entity['payments'][-1]['payment_id'] # Extract if needed
             
             # Find job by Razorpay Order ID (Link ID)
-            job = db.query(Job).filter(Job.razorpay_order_id == pl_id).first()
+            job = (await db.execute(select(Job).where(Job.razorpay_order_id == pl_id).limit(1))).scalar()
             if job:
                 job.status = "paid"
+                job.paid_at = datetime.datetime.utcnow()
                 # job.razorpay_payment_id = payment_id 
-                db.commit()
+                await db.commit()
                 print(f"Webhook: Job {job.id} marked as PAID via Link {pl_id}")
+                job_dispatcher.notify(job.id)
                 
         elif event == 'order.paid':
              # If using Orders API instead of Payment Links
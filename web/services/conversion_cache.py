@@ -0,0 +1,146 @@
+import datetime
+import os
+import shutil
+import threading
+import fitz  # PyMuPDF
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from web.models.models import ConversionCacheEntry
+from web.services.page_index import page_index
+
+# Entries used this recently are never evicted: a queued job may be about to read them
+EVICTION_GRACE = datetime.timedelta(minutes=10)
+
+class ConversionCache:
+    """
+    Content-addressed store of converted PDFs, keyed by the sha256 of the upload.
+    A repeat upload of the same file skips conversion and page counting entirely.
+    Total size is capped at CONVERSION_CACHE_MAX_MB; least recently used entries go first.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.pdf")
+
+    def lookup(self, content_hash: str):
+        """
+        Returns the cache entry (with fresh LRU timestamp) or None.
+        """
+        if not content_hash:
+            return None
+        db: Session = SessionLocal()
+        try:
+            entry = db.query(ConversionCacheEntry).filter(ConversionCacheEntry.content_hash == content_hash).first()
+            if not entry:
+                return None
+            if not os.path.exists(entry.pdf_path):
+                # File vanished underneath us; forget it
+                db.delete(entry)
+                db.commit()
+                return None
+            entry.last_used_at = datetime.datetime.utcnow()
+            db.commit()
+            db.refresh(entry)
+            db.expunge(entry)
+            return entry
+        finally:
+            db.close()
+
+    def store(self, content_hash: str, pdf_path: str, move: bool = False) -> ConversionCacheEntry:
+        """
+        Adds a converted PDF to the cache and returns its entry.
+        move=True takes ownership of a temporary conversion output; otherwise the
+        file is hard-linked (or copied) so the caller's file stays in place.
+        """
+        target = self.path_for(content_hash)
+        if os.path.abspath(pdf_path) != os.path.abspath(target):
+            if move:
+                shutil.move(pdf_path, target)
+            else:
+                try:
+                    if os.path.exists(target):
+                        os.remove(target)
+                    os.link(pdf_path, target)
+                except OSError:
+                    shutil.copy2(pdf_path, target)
+
+        with fitz.open(target) as doc:
+            page_count = doc.page_count
+
+        db: Session = SessionLocal()
+        try:
+            entry = db.query(ConversionCacheEntry).filter(ConversionCacheEntry.content_hash == content_hash).first()
+            if not entry:
+                entry = ConversionCacheEntry(content_hash=content_hash)
+                db.add(entry)
+            entry.pdf_path = target
+            entry.page_count = page_count
+            entry.size_bytes = os.path.getsize(target)
+            entry.last_used_at = datetime.datetime.utcnow()
+            db.commit()
+            db.refresh(entry)
+            db.expunge(entry)
+        finally:
+            db.close()
+
+        # First time we hold this document as a PDF: build its per-page index
+        page_index.submit(content_hash, target)
+        self.evict()
+        return entry
+
+    def remove(self, content_hash: str) -> bool:
+        """
+        Drops a single entry and its file. Returns True if something was removed.
+        """
+        db: Session = SessionLocal()
+        try:
+            entry = db.query(ConversionCacheEntry).filter(ConversionCacheEntry.content_hash == content_hash).first()
+            if not entry:
+                return False
+            try:
+                os.remove(entry.pdf_path)
+            except FileNotFoundError:
+                pass
+            db.delete(entry)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def evict(self):
+        """
+        Drops least recently used entries until the cache fits under max_bytes.
+        """
+        with self._evict_lock:
+            db: Session = SessionLocal()
+            try:
+                total = db.query(func.sum(ConversionCacheEntry.size_bytes)).scalar() or 0
+                if total <= self.max_bytes:
+                    return
+                cutoff = datetime.datetime.utcnow() - EVICTION_GRACE
+                candidates = (
+                    db.query(ConversionCacheEntry)
+                    .filter(ConversionCacheEntry.last_used_at < cutoff)
+                    .order_by(ConversionCacheEntry.last_used_at.asc())
+                )
+                for entry in candidates:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(entry.pdf_path)
+                    except FileNotFoundError:
+                        pass
+                    total -= entry.size_bytes or 0
+                    print(f"Conversion Cache: evicted {entry.content_hash[:12]} ({entry.size_bytes} bytes)")
+                    db.delete(entry)
+                db.commit()
+            finally:
+                db.close()
+
+conversion_cache = ConversionCache(settings.CONVERSION_CACHE_DIR, settings.CONVERSION_CACHE_MAX_MB * 1024 * 1024)
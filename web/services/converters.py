@@ -0,0 +1,172 @@
+import abc
+import os
+import threading
+import time
+from core.config import settings
+from core.printing.images import IMAGE_SET_EXT, images_to_pdf, read_image_set
+from core.printing.text_layout import MissingGlyphs, text_to_pdf
+from web.services.office_converter import office_pool
+from web.services.printer_pool import printer_pool
+
+# Leading bytes -> detected type. Content wins over the extension.
+MAGIC_TYPES = [
+    (b"%PDF", "pdf"),
+    (b"\xff\xd8\xff", "image"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"PK\x03\x04", "office"),                   # docx (zip container)
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "office"),  # doc (OLE2)
+]
+
+EXTENSION_TYPES = {
+    ".pdf": "pdf",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".png": "image",
+    IMAGE_SET_EXT: "image_set",
+    ".txt": "text",
+    ".docx": "office",
+    ".doc": "office",
+}
+
+def sniff_type(head: bytes, ext: str) -> str:
+    """
+    Converter key from a file's first bytes and its extension, or None if
+    nothing can handle it. Works on the first chunk of an upload stream.
+    """
+    ext = ext.lower()
+    if ext in (IMAGE_SET_EXT, ".txt"):
+        # No magic number to go by
+        return EXTENSION_TYPES[ext]
+    for magic, file_type in MAGIC_TYPES:
+        if head.startswith(magic):
+            return file_type
+    return EXTENSION_TYPES.get(ext)
+
+def detect_type(path: str) -> str:
+    """
+    Returns the converter key for a file, or None if nothing can handle it.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+    except OSError:
+        head = b""
+    return sniff_type(head, os.path.splitext(path)[1])
+
+class Converter(abc.ABC):
+    """
+    Turns one kind of input into a PDF. convert() returns the PDF path (which may
+    be the input itself) and raises on failure.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def convert(self, input_path: str, output_pdf: str) -> str:
+        ...
+
+class PdfConverter(Converter):
+    name = "pdf"
+
+    def convert(self, input_path, output_pdf):
+        return input_path
+
+class ImageConverter(Converter):
+    """
+    Photos (one file or an .imgset of several), via the in-process image pipeline.
+    """
+    name = "image"
+
+    def convert(self, input_path, output_pdf):
+        paths = read_image_set(input_path) if input_path.lower().endswith(IMAGE_SET_EXT) else [input_path]
+        return images_to_pdf(
+            paths,
+            output_pdf,
+            dpi=settings.IMAGE_DPI,
+            margin_mm=settings.IMAGE_MARGIN_MM,
+            grayscale=printer_pool.all_mono(),
+            workers=settings.IMAGE_WORKERS or None,
+        )
+
+class TextConverter(Converter):
+    """
+    Plain text laid out in-process with PyMuPDF; no LibreOffice round trip.
+    Scripts the monospace font can't draw go to LibreOffice, which has the fonts.
+    """
+    name = "text"
+
+    def convert(self, input_path, output_pdf):
+        try:
+            return text_to_pdf(input_path, output_pdf, font_size=settings.TEXT_FONT_SIZE)
+        except MissingGlyphs as e:
+            print(f"Text layout: {e}, converting {os.path.basename(input_path)} with LibreOffice")
+            return office_pool.convert(input_path, output_pdf)
+
+class OfficeConverter(Converter):
+    """
+    Word documents, through the warm LibreOffice pool. The only formats that need it.
+    """
+    name = "office"
+
+    def convert(self, input_path, output_pdf):
+        return office_pool.convert(input_path, output_pdf)
+
+class ConverterRegistry:
+    """
+    Maps detected file types to converters and keeps per-converter timing,
+    so /health shows which formats drive conversion cost.
+    """
+    def __init__(self):
+        self._converters = {}
+        self._lock = threading.Lock()
+        self._stats = {}  # converter name -> [count, failed, total_seconds, max_seconds]
+
+    def register(self, file_type: str, converter: Converter):
+        self._converters[file_type] = converter
+        self._stats.setdefault(converter.name, [0, 0, 0.0, 0.0])
+
+    def converter_for(self, path: str) -> Converter:
+        file_type = detect_type(path)
+        converter = self._converters.get(file_type)
+        if converter is None:
+            raise ValueError(f"Unsupported file type: {os.path.splitext(path)[1].lower() or file_type}")
+        return converter
+
+    def convert(self, input_path: str, output_pdf: str) -> str:
+        converter = self.converter_for(input_path)
+        started = time.monotonic()
+        ok = False
+        try:
+            result = converter.convert(input_path, output_pdf)
+            ok = bool(result)
+            return result
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                stats = self._stats[converter.name]
+                stats[0] += 1
+                stats[1] += 0 if ok else 1
+                stats[2] += elapsed
+                stats[3] = max(stats[3], elapsed)
+            if converter.name != "pdf":
+                outcome = "Converted" if ok else "Conversion FAILED"
+                print(f" -> {outcome} with '{converter.name}' in {elapsed:.2f}s: {os.path.basename(input_path)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "conversions": count,
+                    "failed": failed,
+                    "avg_seconds": round(total / count, 3) if count else 0.0,
+                    "max_seconds": round(longest, 3),
+                }
+                for name, (count, failed, total, longest) in self._stats.items()
+            }
+
+converter_registry = ConverterRegistry()
+converter_registry.register("pdf", PdfConverter())
+_images = ImageConverter()
+converter_registry.register("image", _images)
+converter_registry.register("image_set", _images)
+converter_registry.register("text", TextConverter())
+converter_registry.register("office", OfficeConverter())
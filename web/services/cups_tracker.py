@@ -0,0 +1,167 @@
+import datetime
+import threading
+import time
+import traceback
+import cups
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from web.models.models import Job, PrintChunk
+from web.services.job_processor import job_processor
+
+# IPP job-state values
+JOB_PROCESSING = 5
+JOB_STOPPED = 6
+JOB_CANCELED = 7
+JOB_ABORTED = 8
+JOB_COMPLETED = 9
+
+TRACKED_ATTRIBUTES = ["job-id", "job-state", "job-state-reasons", "job-impressions-completed", "job-media-sheets-completed"]
+
+class CupsTracker:
+    """
+    Follows spooled jobs until the printer is actually done with them.
+    printFile() returning an id only means "accepted by CUPS", so jobs stay
+    'printing' until this watcher sees CUPS report them completed (or not).
+    One connection and one batched getJobs() per poll, however many jobs are in flight.
+    Large documents streamed as chunks are tracked per chunk and rolled up into the Job.
+    Queue waits (paid until the printer starts on it) are recorded into wait_stats.
+    """
+    def __init__(self, poll_interval: float, wait_stats=None):
+        self.poll_interval = poll_interval
+        self.wait_stats = wait_stats
+        self.conn = None
+        self._stopped_reported = set()
+        self._started = set()  # printing job ids whose wait is recorded
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name="cups-tracker", daemon=True)
+        thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"CUPS Tracker Error: {e}")
+                traceback.print_exc()
+                self.conn = None  # reconnect next round
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        db: Session = SessionLocal()
+        try:
+            in_flight = db.query(Job).filter(Job.status == "printing", Job.cups_job_id.isnot(None)).all()
+            if not in_flight:
+                return
+            chunked = [job for job in in_flight if job.chunks_total]
+            single = [job for job in in_flight if not job.chunks_total]
+            chunks = []
+            if chunked:
+                chunks = db.query(PrintChunk).filter(
+                    PrintChunk.job_id.in_([job.id for job in chunked]),
+                    PrintChunk.status == "printing",
+                ).all()
+
+            if self.conn is None:
+                self.conn = cups.Connection()
+            # Single batched query covering every in-flight job and chunk
+            cups_ids = [job.cups_job_id for job in single] + [chunk.cups_job_id for chunk in chunks]
+            cups_jobs = {}
+            if cups_ids:
+                cups_jobs = self.conn.getJobs(
+                    which_jobs="all",
+                    first_job_id=min(cups_ids),
+                    requested_attributes=TRACKED_ATTRIBUTES,
+                )
+
+            # Batched jobs share one CUPS job; its page counter covers all of them
+            per_cups_job = {}
+            for job in single:
+                per_cups_job[job.cups_job_id] = per_cups_job.get(job.cups_job_id, 0) + 1
+            for job in single:
+                self._note_started(job, cups_jobs.get(job.cups_job_id))
+                shared = per_cups_job[job.cups_job_id] > 1
+                self._apply(job, cups_jobs.get(job.cups_job_id), shared)
+
+            by_id = {job.id: job for job in chunked}
+            for chunk in chunks:
+                if chunk.seq == 0:
+                    self._note_started(by_id[chunk.job_id], cups_jobs.get(chunk.cups_job_id))
+                self._apply(chunk, cups_jobs.get(chunk.cups_job_id), label=f"Job #{chunk.job_id} chunk {chunk.seq + 1}")
+            db.flush()
+            for job in chunked:
+                self._roll_up(db, job)
+            db.commit()
+            self._started &= {job.id for job in in_flight if job.status == "printing"}
+        finally:
+            db.close()
+
+    def _note_started(self, job: Job, attrs: dict):
+        """
+        Records how long the job waited once CUPS starts (or has finished) printing
+        it; spooling alone says nothing, it may still sit behind others in CUPS.
+        """
+        if job.id in self._started:
+            return
+        # None: purged from CUPS history, so finished
+        if attrs is not None and attrs.get("job-state") not in (JOB_PROCESSING, JOB_COMPLETED):
+            return
+        self._started.add(job.id)
+        ready_at = job.paid_at or job.created_at
+        if self.wait_stats and ready_at:
+            waited = (datetime.datetime.utcnow() - ready_at).total_seconds()
+            self.wait_stats.record(waited)
+            print(f"CUPS Tracker: Job #{job.id} started printing after waiting {waited:.1f}s")
+
+    def _apply(self, job, attrs: dict, shared: bool = False, label: str = None):
+        """
+        Updates a Job (or PrintChunk) from its CUPS job attributes.
+        """
+        label = label or f"Job #{job.id}"
+        if attrs is None:
+            # Purged from CUPS history, which only happens to finished jobs
+            job.status = "completed"
+            print(f"CUPS Tracker: {label} (CUPS {job.cups_job_id}) no longer listed, assuming completed")
+            return
+
+        pages = attrs.get("job-impressions-completed") or attrs.get("job-media-sheets-completed")
+        if pages and not shared:
+            job.pages_printed = pages
+
+        state = attrs.get("job-state")
+        if state == JOB_COMPLETED:
+            job.status = "completed"
+            print(f"CUPS Tracker: {label} completed ({job.pages_printed} pages)")
+        elif state in (JOB_CANCELED, JOB_ABORTED):
+            job.status = "failed"
+            print(f"CUPS Tracker: {label} {'canceled' if state == JOB_CANCELED else 'aborted'} by CUPS: {attrs.get('job-state-reasons')}")
+        elif state == JOB_STOPPED and job.cups_job_id not in self._stopped_reported:
+            # Paper jam / out of paper: stays 'printing' until someone fixes the printer
+            self._stopped_reported.add(job.cups_job_id)
+            print(f"CUPS Tracker: {label} stopped: {attrs.get('job-state-reasons')}")
+
+    def _roll_up(self, db: Session, job: Job):
+        """
+        Derives a chunked Job's progress from its chunks: completed once all
+        chunks_total have printed, failed as soon as any chunk fails or the worker
+        sending them stops renewing its lease before the last one.
+        """
+        chunks = db.query(PrintChunk).filter(PrintChunk.job_id == job.id).all()
+        done = [chunk for chunk in chunks if chunk.status == "completed"]
+        job.pages_printed = sum(chunk.pages for chunk in done) + sum(
+            chunk.pages_printed or 0 for chunk in chunks if chunk.status == "printing"
+        )
+        if any(chunk.status == "failed" for chunk in chunks):
+            job.status = "failed"
+            print(f"CUPS Tracker: Job #{job.id} failed ({len(done)}/{job.chunks_total} chunks printed)")
+        elif len(chunks) < job.chunks_total and (job.lease_expires_at or datetime.datetime.min) < datetime.datetime.utcnow():
+            # The rest will never be sent; reprinting would duplicate what already came out.
+            # No lease at all: stuck since before streaming jobs kept one
+            job.status = "failed"
+            print(f"CUPS Tracker: Job #{job.id} failed, streaming stopped after {len(chunks)}/{job.chunks_total} chunks (worker {job.worker_id})")
+        elif len(done) >= job.chunks_total:
+            job.status = "completed"
+            print(f"CUPS Tracker: Job #{job.id} completed ({job.chunks_total} chunks, {job.pages_printed} pages)")
+
+cups_tracker = CupsTracker(settings.CUPS_POLL_INTERVAL, job_processor.wait_stats)
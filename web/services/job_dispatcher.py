@@ -0,0 +1,52 @@
+import queue
+import threading
+
+
+class JobDispatcher:
+    """
+    In-process wake-up channel between status transitions and the print worker.
+
+    Anything that makes a job ready to print (e.g. the Razorpay webhook marking it
+    'paid') calls notify(). The worker blocks in wait() and wakes immediately
+    instead of sleeping out a fixed poll interval. The DB stays the source of
+    truth: a notification is only a hint to go and look.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.notifications = 0
+
+    def notify(self, job_id: str = None):
+        """
+        Wake the worker. job_id is optional (None means "sweep everything").
+        """
+        with self._lock:
+            self.notifications += 1
+        self._queue.put(job_id)
+
+    def wait(self, timeout: float) -> list:
+        """
+        Blocks until at least one notification arrives or timeout expires.
+        Returns every job id queued so far (collapsed), or an empty list if the
+        wait timed out and the caller should do a safety-net sweep.
+        """
+        try:
+            first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+        job_ids = [first]
+        # Collapse a burst of notifications into a single wake-up
+        while True:
+            try:
+                job_ids.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return job_ids
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+job_dispatcher = JobDispatcher()
@@ -1,80 +1,655 @@
+import datetime
+import math
+import os
+import queue
+import socket
+import threading
 import time
 import traceback
+from sqlalchemy import and_, or_, update
 from sqlalchemy.orm import Session
+from core.config import settings
 from core.database import SessionLocal
-from web.models.models import Job
+from core.printing.page_utils import PageSet
+from core.printing.scheduling import QueuedJob, WaitStats, get_policy, job_sheets
+from web.models.models import Job, PrintChunk
 from web.services.printer_service import printer_service
+from web.services.conversion_cache import conversion_cache
+from web.services.page_index import page_index
+from web.services.preconvert import speculative_converter
+
+# Seconds between printer backlog checks while the print stage holds jobs
+HOLD_POLL_SECONDS = 1.0
+
+class PrintContext:
+    """
+    Everything a job carries between pipeline stages.
+    Stages read/write plain attributes so the DB is only touched on status changes.
+    """
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.file_path = job.file_path
+        self.copies = job.copies or 1
+        self.is_duplex = bool(job.is_duplex)
+        self.page_range = job.page_range
+        self.content_hash = job.content_hash
+        self.filename = job.filename
+        self.ready_at = job.paid_at or job.created_at
+        self.claimed_at = datetime.datetime.utcnow()
+        self.pdf_path = None      # set by convert stage (optimize may replace it)
+        self.print_path = None    # set by slice stage
+        self.print_pages = 0      # pages that will print, set by slice stage
+        self.page_ranges = None   # canonical range for CUPS to apply, when not sliced
+        self.chunked = None       # PageSet to stream in chunks (large documents)
+        self.timings = {}         # stage name -> seconds
+
+    def queued(self) -> QueuedJob:
+        return QueuedJob(
+            id=self.job_id,
+            ready_at=self.ready_at or self.claimed_at,
+            sheets=job_sheets(self.print_pages, self.copies, self.is_duplex),
+        )
+
+class PolicyQueue(queue.Queue):
+    """
+    A stage queue that hands out the job the scheduling policy wants next
+    instead of the oldest one, re-ranked on every get() so aging keeps working.
+    """
+    def __init__(self, policy, maxsize: int = 0):
+        self.policy = policy
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self.items = []
+
+    def _qsize(self):
+        return len(self.items)
+
+    def _put(self, ctx):
+        self.items.append(ctx)
+
+    def _get(self):
+        queued = [ctx.queued() for ctx in self.items]
+        best = self.policy.order(queued, datetime.datetime.utcnow())[0]
+        return self.items.pop(next(i for i, job in enumerate(queued) if job is best))
+
+class PipelineStage:
+    """
+    One step of the print pipeline: a bounded input queue plus its own worker thread(s).
+    The handler takes a PrintContext and raises on failure. A full queue blocks the
+    previous stage, so a slow printer applies back-pressure all the way to claiming.
+    With a gate, the stage only takes its next job while gate() returns True.
+    """
+    def __init__(self, name: str, handler, on_failure, workers: int = 1, maxsize: int = 4, job_queue=None, gate=None):
+        self.name = name
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = max(1, workers)
+        self.queue = job_queue if job_queue is not None else queue.Queue(maxsize=maxsize)
+        self.gate = gate
+        self.next_stage = None
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+
+    def submit(self, ctx: PrintContext):
+        self.queue.put(ctx)
+
+    def _run(self):
+        while True:
+            while self.gate and not self.gate():
+                time.sleep(HOLD_POLL_SECONDS)
+            ctx = self.queue.get()
+            with self._lock:
+                self.in_flight += 1
+            started = time.monotonic()
+            try:
+                self.handler(ctx)
+                ok = True
+            except Exception as e:
+                print(f" -> FAILURE for Job #{ctx.job_id} in stage '{self.name}': {e}")
+                traceback.print_exc()
+                ok = False
+
+            elapsed = time.monotonic() - started
+            ctx.timings[self.name] = elapsed
+            with self._lock:
+                self.in_flight -= 1
+                self.last_seconds = elapsed
+                self.total_seconds += elapsed
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+
+            # This thread is the stage's only consumer: nothing may escape the loop
+            try:
+                if not ok:
+                    self.on_failure(ctx)
+                elif self.next_stage:
+                    self.next_stage.submit(ctx)
+            except Exception as e:
+                print(f" -> FAILURE handing off Job #{ctx.job_id} from stage '{self.name}': {e}")
+                traceback.print_exc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.processed + self.failed
+            return {
+                "queued": self.queue.qsize(),
+                "in_flight": self.in_flight,
+                "processed": self.processed,
+                "failed": self.failed,
+                "avg_seconds": round(self.total_seconds / done, 3) if done else 0.0,
+                "last_seconds": round(self.last_seconds, 3),
+            }
 
 class JobProcessor:
+    """
+    Staged print pipeline: convert -> optimize -> slice -> print.
+    Each stage has its own worker(s), so job N+1 is converted while job N is printing.
+    """
+    def __init__(self):
+        # Which paid job goes next (fifo / sjf / sjf_aging)
+        self.policy = get_policy(settings.SCHEDULING_POLICY, settings.SCHEDULING_AGING_RATE)
+        self.wait_stats = WaitStats(self.policy.name)
+
+        size = settings.PIPELINE_QUEUE_SIZE
+        self.convert_stage = PipelineStage("convert", self._convert, self._fail,
+                                           workers=settings.PIPELINE_CONVERT_WORKERS, maxsize=size)
+        self.optimize_stage = PipelineStage("optimize", self._optimize, self._fail, maxsize=size)
+        self.slice_stage = PipelineStage("slice", self._slice, self._fail, maxsize=size)
+        # Prepared jobs wait here, in policy order, rather than in CUPS's FIFO queue
+        self.print_stage = PipelineStage("print", self._print, self._fail,
+                                         job_queue=PolicyQueue(self.policy, maxsize=size), gate=self._printers_have_room)
+
+        self.convert_stage.next_stage = self.optimize_stage
+        self.optimize_stage.next_stage = self.slice_stage
+        self.slice_stage.next_stage = self.print_stage
+        self.stages = [self.convert_stage, self.optimize_stage, self.slice_stage, self.print_stage]
+
+        # Identifies this process in jobs.worker_id; several may share one DB
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        self._leased = set()  # job ids this process currently holds a lease on
+        self._leased_lock = threading.Lock()
+
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for stage in self.stages:
+                stage.start()
+            threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True).start()
+            self._started = True
+
+    def stats(self) -> dict:
+        stats = {stage.name: stage.stats() for stage in self.stages}
+        stats["scheduler"] = self.wait_stats.snapshot()
+        return stats
+
+    def _claimable(self, now: datetime.datetime):
+        """
+        Paid jobs, plus jobs whose worker died mid-processing (lease expired).
+        """
+        return or_(
+            Job.status == "paid",
+            and_(Job.status == "processing", Job.lease_expires_at < now),
+        )
+
+    def claim(self, db: Session, job_id: str) -> bool:
+        """
+        Atomically takes ownership of a job. The conditional UPDATE only matches
+        while the job is still claimable, so exactly one worker (thread or
+        process) wins, however many race for it.
+        """
+        now = datetime.datetime.utcnow()
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id, self._claimable(now))
+            .values(status="processing", worker_id=self.worker_id, lease_expires_at=now + self.lease)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            return False
+        with self._leased_lock:
+            self._leased.add(job_id)
+        return True
+
+    def next_job_id(self, db: Session, exclude: set):
+        """
+        Picks the claimable job the scheduling policy wants next, or None.
+        """
+        now = datetime.datetime.utcnow()
+        query = db.query(
+            Job.id, Job.created_at, Job.paid_at, Job.page_count,
+            Job.page_range, Job.copies, Job.is_duplex,
+        ).filter(self._claimable(now))
+        if exclude:
+            # Never spin on a job we already tried (lost race, failing update)
+            query = query.filter(~Job.id.in_(exclude))
+
+        queued = []
+        for row in query:
+            pages = len(PageSet.parse(row.page_range, row.page_count or 1))
+            queued.append(QueuedJob(
+                id=row.id,
+                ready_at=row.paid_at or row.created_at or now,
+                sheets=job_sheets(pages, row.copies, row.is_duplex),
+            ))
+        if not queued:
+            return None
+        return self.policy.order(queued, now)[0].id
+
     def process_pending_jobs(self):
         """
-        Main loop to find and process paid jobs.
+        Claims every ready job, in scheduling-policy order, and feeds it into the pipeline.
+        Returns the number of jobs this worker claimed in this pass.
+        """
+        self.start()
+        attempted = set()
+        claimed = 0
+        while True:
+            db: Session = SessionLocal()
+            ctx = None
+            try:
+                # Re-evaluated every time, so jobs paid meanwhile compete fairly
+                job_id = self.next_job_id(db, attempted)
+                if not job_id:
+                    return claimed
+
+                attempted.add(job_id)
+                if self.claim(db, job_id):
+                    ctx = PrintContext(db.query(Job).filter(Job.id == job_id).first())
+            except Exception as e:
+                print(f"Job Scheduler Error: {e}")
+                return claimed
+            finally:
+                db.close()
+
+            if ctx:
+                claimed += 1
+                print(f"Build-Proof Processor: Starting Job #{ctx.job_id} (worker {self.worker_id})")
+                # Blocks when the pipeline is full (back-pressure)
+                self.convert_stage.submit(ctx)
+
+    def _heartbeat(self):
+        """
+        Renews the lease on every job this process holds, well before it expires.
+        """
+        while True:
+            time.sleep(self.lease.total_seconds() / 3)
+            with self._leased_lock:
+                job_ids = list(self._leased)
+            if not job_ids:
+                continue
+            db: Session = SessionLocal()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id.in_(job_ids), Job.worker_id == self.worker_id, Job.status == "processing")
+                    .values(lease_expires_at=datetime.datetime.utcnow() + self.lease)
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Lease Heartbeat Error: {e}")
+            finally:
+                db.close()
+
+    def _still_owned(self, job_id: str) -> bool:
+        """
+        Renews the lease and reports whether we still own the job.
+        Checked right before anything irreversible (sending to CUPS).
         """
         db: Session = SessionLocal()
         try:
-            # Find a single job to process
-            job = db.query(Job).filter(Job.status == "paid").first()
-            if job:
-                self.process_single_job(job.id)
-        except Exception as e:
-            print(f"Job Scheduler Error: {e}")
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker_id == self.worker_id, Job.status == "processing")
+                .values(lease_expires_at=datetime.datetime.utcnow() + self.lease)
+            )
+            db.commit()
+            return result.rowcount == 1
         finally:
             db.close()
 
-    def process_single_job(self, job_id: int):
+    # --- Stage handlers -------------------------------------------------
+
+    def _convert(self, ctx: PrintContext):
+        # Join any speculative conversion still running rather than converting twice
+        speculative_converter.wait(ctx.job_id)
+        cached = conversion_cache.lookup(ctx.content_hash)
+        if cached:
+            print(f" -> Conversion cache hit: {ctx.file_path}")
+            ctx.pdf_path = cached.pdf_path
+            return
+
+        print(f" -> Converting: {ctx.file_path}")
+        ctx.pdf_path = printer_service.convert_to_pdf(ctx.file_path)
+        if not ctx.pdf_path:
+            raise Exception("Conversion returned None")
+
+        if ctx.content_hash:
+            # Keep the upload itself in place; take ownership of converter output
+            entry = conversion_cache.store(ctx.content_hash, ctx.pdf_path, move=ctx.pdf_path != ctx.file_path)
+            ctx.pdf_path = entry.pdf_path
+
+    def _optimize(self, ctx: PrintContext):
         """
-        Process a specific job with robust error handling and retries.
+        Shrinks the PDF before it reaches CUPS and the printer's RIP. Best effort:
+        any problem leaves the converted PDF as it is.
         """
-        db: Session = SessionLocal()
-        job = db.query(Job).filter(Job.id == job_id).first()
-        
-        if not job:
+        if not settings.PDF_OPTIMIZE_ENABLED:
+            return
+        if settings.LARGE_DOC_CHUNK_PAGES > 0 and self._page_count(ctx) > settings.LARGE_DOC_MIN_PAGES:
+            # A whole-file rewrite would delay the first streamed chunk
             return
 
-        print(f"Build-Proof Processor: Starting Job #{job.id}")
-        
+        dpi = settings.PDF_OPTIMIZE_DPI or printer_service.pool.native_dpi() or 600
+        grayscale = settings.PDF_OPTIMIZE_GRAYSCALE and printer_service.pool.all_mono()
+        output_path = f"{os.path.splitext(ctx.file_path)[0]}_optimized.pdf"
+        started = time.monotonic()
         try:
-            # 1. Mark Processing
-            job.status = "processing"
-            db.commit()
+            path, before, after = printer_service.optimize_pdf(ctx.pdf_path, output_path, dpi, grayscale)
+        except Exception as e:
+            print(f" -> Optimize skipped for Job #{ctx.job_id}: {e}")
+            return
+        elapsed = time.monotonic() - started
+        if path == ctx.pdf_path:
+            print(f" -> Optimize: Job #{ctx.job_id} already compact ({before / 1024:.0f} KB, {elapsed:.2f}s spent)")
+            return
+        ctx.pdf_path = path
+        print(f" -> Optimized Job #{ctx.job_id}: {before / 1024:.0f} KB -> {after / 1024:.0f} KB "
+              f"(-{100 * (before - after) / before:.0f}%, {dpi} dpi{', grayscale' if grayscale else ''}, {elapsed:.2f}s)")
 
-            # 2. Conversion Phase
-            print(f" -> Converting: {job.file_path}")
-            final_pdf = printer_service.convert_to_pdf(job.file_path)
-            
-            if not final_pdf:
-                raise Exception("Conversion returned None")
+    def _page_count(self, ctx: PrintContext) -> int:
+        # The page index knows the count without reopening the PDF
+        return page_index.page_count(ctx.content_hash) or printer_service.count_pages(ctx.pdf_path)
 
-            # 3. Printing Phase
-            print(f" -> Printing: {final_pdf} | Copies: {job.copies} | Duplex: {job.is_duplex} | Range: {job.page_range}")
-            job.status = "printing"
-            db.commit()
+    def _slice(self, ctx: PrintContext):
+        selection = PageSet.parse(ctx.page_range, self._page_count(ctx))
+        if not len(selection):
+            raise Exception(f"Page range '{ctx.page_range}' selects no pages")
+        ctx.print_pages = len(selection)
+
+        if settings.LARGE_DOC_CHUNK_PAGES > 0 and ctx.print_pages > settings.LARGE_DOC_MIN_PAGES:
+            # Cut lazily by the print stage, one chunk at a time
+            ctx.print_path = ctx.pdf_path
+            ctx.chunked = selection
+        elif selection.is_all():
+            ctx.print_path = ctx.pdf_path
+        elif settings.CUPS_NATIVE_PAGE_RANGES and printer_service.pool.supports_page_ranges():
+            # CUPS selects the pages: no full read+write of the PDF on flash
+            ctx.print_path = ctx.pdf_path
+            ctx.page_ranges = selection.to_cups_ranges()
+        else:
+            # Name the slice after the job, the source PDF may be shared via the cache
+            output_path = f"{os.path.splitext(ctx.file_path)[0]}_sliced.pdf"
+            ctx.print_path = printer_service.apply_page_range(ctx.pdf_path, ctx.page_range, output_path)
+
+    def _print(self, ctx: PrintContext):
+        """
+        Submits ctx, batched with other small queued jobs when BATCH_ENABLED.
+        Jobs pulled in that can't join the batch are submitted right after it.
+        """
+        error = None
+        pending = [ctx]
+        while pending:
+            current = pending.pop(0)
+            batch, leftover = ([current], None) if current.chunked else self._collect_batch(current)
+            if leftover:
+                pending.append(leftover)
+            try:
+                if current.chunked:
+                    # Possibly a leftover of the batch collector: it must still be streamed
+                    self._submit_chunked(current)
+                else:
+                    self._submit(batch)
+            except Exception as e:
+                print(f" -> FAILURE submitting {len(batch)} job(s): {e}")
+                for item in batch:
+                    if item is ctx:
+                        error = e  # the stage marks ctx failed and counts it
+                    else:
+                        self._fail(item)
+        if error:
+            raise error
+
+    def _printers_have_room(self) -> bool:
+        """
+        Print-stage gate: True once the least busy printer has fewer than
+        SCHEDULING_HOLD_PAGES pages queued. CUPS prints in arrival order, so a job
+        sent any earlier could no longer be overtaken by a shorter one paid later.
+        """
+        if settings.SCHEDULING_HOLD_PAGES <= 0 or printer_service.mock_mode:
+            return True
+        try:
+            printer_service.pool.refresh(printer_service.conn)
+        except Exception as e:
+            print(f"Print hold: printer refresh failed, releasing: {e}")
+            return True
+        backlog = printer_service.pool.shortest_backlog()
+        # No printer online: let the submission report it
+        return backlog is None or backlog < settings.SCHEDULING_HOLD_PAGES
+
+    def _is_small(self, ctx: PrintContext) -> bool:
+        return job_sheets(ctx.print_pages, ctx.copies, ctx.is_duplex) <= settings.BATCH_MAX_SHEETS
 
+    def _more_coming(self) -> bool:
+        # Only worth holding a batch open if earlier stages still have work
+        return any(stage.queue.qsize() or stage.in_flight for stage in (self.convert_stage, self.optimize_stage, self.slice_stage))
+
+    def _collect_batch(self, first: PrintContext):
+        """
+        Gathers small jobs with the same duplex setting from the print queue,
+        for up to BATCH_WINDOW_SECONDS. Returns (batch, leftover) where leftover
+        is a job that was taken off the queue but can't join this batch.
+        """
+        if not settings.BATCH_ENABLED or not self._is_small(first):
+            return [first], None
+
+        batch = [first]
+        deadline = time.monotonic() + settings.BATCH_WINDOW_SECONDS
+        while len(batch) < settings.BATCH_MAX_JOBS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                if self.print_stage.queue.empty() and not self._more_coming():
+                    break
+                nxt = self.print_stage.queue.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+            if nxt.is_duplex == first.is_duplex and self._is_small(nxt) and not nxt.chunked:
+                batch.append(nxt)
+            else:
+                return batch, nxt
+        return batch, None
+
+    def _submit(self, batch: list):
+        owned = []
+        for ctx in batch:
+            if self._still_owned(ctx.job_id):
+                owned.append(ctx)
+            else:
+                # Our lease lapsed and another worker reclaimed the job: never double-print
+                print(f" -> Job #{ctx.job_id} lease lost, dropping without printing")
+                self._release(ctx.job_id)
+        if not owned:
+            return
+
+        first = owned[0]
+        if len(owned) == 1:
+            print(f" -> Printing: {first.print_path} | Copies: {first.copies} | Duplex: {first.is_duplex} | Range: {first.page_range}")
+            # Pages were either sliced already or are selected by CUPS (page_ranges)
             cups_job_id = printer_service.print_job(
-                final_pdf, 
-                job.id, 
-                copies=job.copies, 
-                is_duplex=job.is_duplex,
-                page_range=job.page_range
+                first.print_path,
+                first.job_id,
+                copies=first.copies,
+                is_duplex=first.is_duplex,
+                page_ranges=first.page_ranges,
+                # Used only if no printer can apply page_ranges after all; same name as _slice's
+                slice_path=f"{os.path.splitext(first.file_path)[0]}_sliced.pdf",
+            )
+        else:
+            merged_path = f"{os.path.splitext(first.file_path)[0]}_batch.pdf"
+            printer_service.merge_for_batch(
+                [(c.print_path, c.page_ranges, c.copies, f"PrintBot Job {c.job_id[:8]} - {c.filename}") for c in owned],
+                merged_path,
+                is_duplex=first.is_duplex,
+                separator=settings.BATCH_SEPARATOR_PAGE,
             )
+            print(f" -> Printing batch of {len(owned)} jobs: {merged_path} | Duplex: {first.is_duplex}")
+            cups_job_id = printer_service.print_job(
+                merged_path,
+                f"Batch_{first.job_id}",
+                copies=1,
+                is_duplex=first.is_duplex,
+            )
+        if not cups_job_id:
+            raise Exception("CUPS submission failed (No Job ID)")
 
-            if cups_job_id:
-                job.status = "completed"
-                print(f" -> SUCCESS. CUPS Job ID: {cups_job_id}")
+        for ctx in owned:
+            if printer_service.mock_mode:
+                self._set_status(ctx.job_id, "completed")
             else:
-                raise Exception("CUPS submission failed (No Job ID)")
+                # Spooled, not printed: the CUPS tracker moves it on to completed/failed
+                self._set_status(ctx.job_id, "printing", cups_job_id=cups_job_id)
+            waited = (datetime.datetime.utcnow() - ctx.ready_at).total_seconds() if ctx.ready_at else None
+            if printer_service.mock_mode:
+                # Nothing for the CUPS tracker to follow; it records real jobs once they start printing
+                self.wait_stats.record(waited)
+            timings = ", ".join(f"{name}={secs:.2f}s" for name, secs in ctx.timings.items())
+            wait_text = f", waited {waited:.1f}s under {self.policy.name}" if waited is not None else ""
+            print(f" -> SPOOLED Job #{ctx.job_id}. CUPS Job ID: {cups_job_id} ({timings}{wait_text})")
+
+    def _submit_chunked(self, ctx: PrintContext):
+        """
+        Streams a large document to CUPS as ordered sub-jobs of LARGE_DOC_CHUNK_PAGES
+        pages on one printer. The first chunk is submitted as soon as it is cut, so
+        time-to-first-page does not grow with the document. The job turns 'printing'
+        right then; the CUPS tracker completes it once every chunk has printed.
+        While chunks are still being sent the job keeps a lease, renewed with every
+        chunk, so the tracker can fail it if this process dies mid-stream.
+        """
+        if not self._still_owned(ctx.job_id):
+            print(f" -> Job #{ctx.job_id} lease lost, dropping without printing")
+            self._release(ctx.job_id)
+            return
 
+        chunk_pages = settings.LARGE_DOC_CHUNK_PAGES
+        if ctx.is_duplex and chunk_pages % 2:
+            # An odd chunk would leave the back of its last sheet for the next chunk
+            chunk_pages += 1
+        total = math.ceil(ctx.print_pages / chunk_pages) * ctx.copies
+        print(f" -> Streaming: {ctx.print_path} | {ctx.print_pages} pages in {total} chunk(s) | Copies: {ctx.copies} | Duplex: {ctx.is_duplex}")
+
+        prefix = f"{os.path.splitext(ctx.file_path)[0]}_chunk"
+        written = []
+        printer = None
+        seq = 0
+        try:
+            # Copies are sent as whole passes over the chunks so every copy stays collated
+            for copy in range(ctx.copies):
+                chunks = printer_service.iter_chunks(ctx.print_path, ctx.chunked, chunk_pages, prefix) if copy == 0 else written
+                for chunk_path, pages in chunks:
+                    if copy == 0:
+                        written.append((chunk_path, pages))
+                    if seq and self._job_failed(ctx.job_id):
+                        print(f" -> Job #{ctx.job_id} failed in CUPS, not sending chunks {seq + 1}-{total}")
+                        return
+
+                    cups_job_id = printer_service.print_job(
+                        chunk_path,
+                        f"{ctx.job_id}_part{seq + 1}",
+                        is_duplex=ctx.is_duplex,
+                        printer=printer,
+                    )
+                    if not cups_job_id:
+                        raise Exception(f"CUPS submission failed for chunk {seq + 1}/{total} (No Job ID)")
+                    self._record_chunk(ctx.job_id, seq, cups_job_id, pages, last=seq + 1 == total)
+
+                    if seq == 0:
+                        # Later chunks follow the first onto the same queue, keeping page order
+                        printer = printer_service.pool.printer_of(cups_job_id)
+                        if not printer_service.mock_mode:
+                            self._set_status(
+                                ctx.job_id, "printing", cups_job_id=cups_job_id, chunks_total=total,
+                                lease_expires_at=None if total == 1 else datetime.datetime.utcnow() + self.lease,
+                            )
+                        if printer_service.mock_mode:
+                            waited = (datetime.datetime.utcnow() - ctx.ready_at).total_seconds() if ctx.ready_at else None
+                            self.wait_stats.record(waited)
+                        timings = ", ".join(f"{name}={secs:.2f}s" for name, secs in ctx.timings.items())
+                        print(f" -> SPOOLED first chunk of Job #{ctx.job_id}. CUPS Job ID: {cups_job_id} ({timings})")
+                    seq += 1
+        finally:
+            # CUPS keeps its own copy of every submitted file
+            for chunk_path, _ in written:
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+        if printer_service.mock_mode:
+            self._set_status(ctx.job_id, "completed", chunks_total=total)
+        print(f" -> SPOOLED all {total} chunk(s) of Job #{ctx.job_id}")
+
+    def _record_chunk(self, job_id: str, seq: int, cups_job_id: int, pages: int, last: bool):
+        """
+        Records a submitted chunk and renews the streaming lease (dropped after the last one).
+        """
+        db: Session = SessionLocal()
+        try:
+            db.add(PrintChunk(job_id=job_id, seq=seq, cups_job_id=cups_job_id, pages=pages))
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker_id == self.worker_id, Job.status == "printing")
+                .values(lease_expires_at=None if last else datetime.datetime.utcnow() + self.lease)
+            )
             db.commit()
+        finally:
+            db.close()
 
-        except Exception as e:
-            print(f" -> FAILURE for Job #{job.id}: {e}")
-            traceback.print_exc()
-            
-            # Simple Retry Logic (could be expanded to a retry_count column)
-            # For now, mark as failed so we don't loop infinitely on a bad file
-            job.status = "failed" 
-            # In a real retry system: if job.retries < 3: job.retries += 1; job.status = "paid"
-            
+    def _job_failed(self, job_id: str) -> bool:
+        db: Session = SessionLocal()
+        try:
+            return db.query(Job.status).filter(Job.id == job_id).scalar() == "failed"
+        finally:
+            db.close()
+
+    def _fail(self, ctx: PrintContext):
+        # Mark as failed so we don't loop infinitely on a bad file
+        self._set_status(ctx.job_id, "failed")
+
+    def _release(self, job_id: str):
+        with self._leased_lock:
+            self._leased.discard(job_id)
+
+    def _set_status(self, job_id: str, status: str, **values):
+        """
+        Moves a job we own out of 'processing' and drops its lease (unless
+        values sets a new one).
+        """
+        self._release(job_id)
+        values = {"lease_expires_at": None, **values}
+        db: Session = SessionLocal()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker_id == self.worker_id)
+                .values(status=status, **values)
+            )
             db.commit()
         finally:
             db.close()
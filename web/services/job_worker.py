@@ -1,33 +1,35 @@
-import time
 import threading
-from sqlalchemy.orm import Session
-from core.database import SessionLocal
-from web.models.models import Job
-from web.services.printer_service import printer_service
 import traceback
-
-def process_jobs():
-    """
-    Background worker that checks for 'paid' jobs and processes them.
-    In a real app, this might be a Celery task.
-    """
+from core.config import settings
+from web.services.job_dispatcher import job_dispatcher
 from web.services.job_processor import job_processor
+from web.services.preconvert import speculative_converter
+from web.services.cups_tracker import cups_tracker
+from web.services.upload_sessions import upload_sessions
 
 def process_jobs():
     """
     Background worker that checks for 'paid' jobs and processes them.
     RELIABILITY MODE: Uses JobProcessor.
+
+    The worker sleeps on the dispatcher and wakes as soon as a job becomes
+    ready (webhook, status change). If nothing is dispatched for
+    WORKER_SWEEP_INTERVAL seconds it sweeps the DB anyway, so a missed
+    notification can only ever delay a job, never lose it.
     """
     while True:
+        job_dispatcher.wait(timeout=settings.WORKER_SWEEP_INTERVAL)
         try:
             job_processor.process_pending_jobs()
+            speculative_converter.sweep_abandoned()
+            upload_sessions.sweep_stale()
         except Exception as e:
             print(f"Worker Loop Critical Error: {e}")
             traceback.print_exc()
-        
-        time.sleep(5) # Poll every 5 seconds
 
 def start_worker():
     thread = threading.Thread(target=process_jobs, daemon=True)
     thread.start()
-
+    cups_tracker.start()
+    # Pick up anything that was paid while we were down
+    job_dispatcher.notify()
@@ -0,0 +1,44 @@
+import asyncio
+import collections
+import threading
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness: a task sleeps for `interval` seconds and
+    records how late it wakes up. Anything that blocks the loop (sync file or DB
+    work inside an async handler) shows up directly as lag.
+    """
+    def __init__(self, interval: float = 0.25, window: int = 240):
+        self.interval = interval
+        self._samples = collections.deque(maxlen=window)  # seconds late, most recent last
+        self._lock = threading.Lock()
+        self._task = None
+
+    def start(self):
+        # Must be called from the running loop (FastAPI lifespan)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            with self._lock:
+                self._samples.append(lag)
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "window_seconds": round(len(samples) * self.interval),
+            "avg_ms": round(1000 * sum(samples) / len(samples), 1),
+            "max_ms": round(1000 * max(samples), 1),
+            "last_ms": round(1000 * samples[-1], 1),
+        }
+
+loop_monitor = LoopLagMonitor()
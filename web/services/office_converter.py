@@ -0,0 +1,207 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from core.config import settings
+
+try:
+    # Ships with LibreOffice (python3-uno on Raspberry Pi OS), not on PyPI
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
+
+BASE_PORT = 2002
+STARTUP_TIMEOUT = 30.0
+
+def _props(**kwargs):
+    values = []
+    for key, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = key
+        prop.Value = value
+        values.append(prop)
+    return tuple(values)
+
+def _process_tree_rss_mb(pid: int) -> float:
+    """
+    Resident memory of a process and all of its children, from /proc.
+    The soffice launcher forks soffice.bin, so the parent alone would read ~0.
+    """
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                stack.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+class OfficeWorker:
+    """
+    One long-lived headless soffice process listening on a local UNO socket.
+    Each worker has its own user profile so instances never fight over the lock file.
+    """
+    def __init__(self, index: int):
+        self.index = index
+        self.port = BASE_PORT + index
+        self.profile_dir = os.path.join(tempfile.gettempdir(), f"printbot-office-{index}")
+        self.process = None
+        self.desktop = None
+        self.conversions = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.stop()
+        cmd = [
+            settings.OFFICE_BINARY, "--headless", "--invisible", "--nologo",
+            "--norestore", "--nodefault", "--nolockcheck",
+            f"-env:UserInstallation=file://{self.profile_dir}",
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.desktop = self._connect()
+        self.conversions = 0
+        print(f"Office Pool: worker {self.index} ready on port {self.port} (pid {self.process.pid})")
+
+    def _connect(self):
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(url)
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if not self.alive or time.monotonic() > deadline:
+                    raise Exception(f"Office worker {self.index} did not come up")
+                time.sleep(0.25)
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def needs_recycle(self) -> bool:
+        if not self.alive:
+            return True
+        if self.conversions >= settings.OFFICE_MAX_CONVERSIONS:
+            return True
+        return _process_tree_rss_mb(self.process.pid) > settings.OFFICE_MAX_RSS_MB
+
+    def convert(self, input_path: str, output_pdf: str):
+        in_url = uno.systemPathToFileUrl(os.path.abspath(input_path))
+        out_url = uno.systemPathToFileUrl(os.path.abspath(output_pdf))
+        doc = self.desktop.loadComponentFromURL(in_url, "_blank", 0, _props(Hidden=True, ReadOnly=True))
+        if doc is None:
+            raise Exception(f"LibreOffice could not open {input_path}")
+        try:
+            doc.storeToURL(out_url, _props(FilterName="writer_pdf_Export"))
+        finally:
+            doc.close(True)
+        self.conversions += 1
+
+class OfficeConverterPool:
+    """
+    Keeps warm LibreOffice instances around so a DOCX conversion doesn't pay the
+    multi-second cold start on every document. Workers are recycled after
+    OFFICE_MAX_CONVERSIONS documents or once they grow past OFFICE_MAX_RSS_MB.
+    Without python3-uno we fall back to one `libreoffice --convert-to` per document.
+    """
+    def __init__(self):
+        self.size = settings.OFFICE_WORKERS or os.cpu_count() or 1
+        self.enabled = uno is not None and shutil.which(settings.OFFICE_BINARY) is not None
+        self._idle = queue.Queue()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Spawns the workers in the background so startup isn't held up by soffice.
+        """
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            self._started = True
+            for i in range(self.size):
+                self._idle.put(OfficeWorker(i))
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _warm_up(self):
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            try:
+                worker.start()
+            except Exception as e:
+                print(f"Office Pool: worker {worker.index} failed to start: {e}")
+            self._idle.put(worker)
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+    def convert(self, input_path: str, output_pdf: str) -> str:
+        if not self.enabled:
+            return self._convert_cold(input_path, output_pdf)
+
+        self.start()
+        worker = self._idle.get()
+        try:
+            if worker.needs_recycle():
+                if worker.process is not None:
+                    print(f"Office Pool: recycling worker {worker.index} after {worker.conversions} conversions")
+                worker.start()
+            worker.convert(input_path, output_pdf)
+            return output_pdf
+        except Exception as e:
+            print(f"Office Pool: warm conversion failed ({e}), falling back to cold start")
+            worker.stop()
+            return self._convert_cold(input_path, output_pdf)
+        finally:
+            self._idle.put(worker)
+
+    def _convert_cold(self, input_path: str, output_pdf: str) -> str:
+        # --headless --convert-to pdf --outdir <dir> <file>
+        cmd = [
+            settings.OFFICE_BINARY, "--headless", "--convert-to", "pdf",
+            "--outdir", os.path.dirname(output_pdf),
+            input_path
+        ]
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return output_pdf
+
+office_pool = OfficeConverterPool()
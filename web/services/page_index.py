@@ -0,0 +1,121 @@
+import threading
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from core.printing.page_analysis import analyze_pdf
+from core.process_pool import spawn_pool
+from web.models.models import PageMetadata
+
+class PageIndex:
+    """
+    Per-page facts about every document (size, blank, ink coverage, colour),
+    computed once per content hash and stored in page_metadata. Slicing, pricing
+    and the settings page read the index instead of reopening the PDF.
+
+    Analysis renders every page, so it runs in a separate process pool and
+    never holds the GIL of the web server.
+    """
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+        self._executor = None  # started on first use, not at import time
+        self._pending = {}     # content_hash -> Event, set once its rows are stored
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = spawn_pool(self.workers)
+        return self._executor
+
+    def submit(self, content_hash: str, pdf_path: str):
+        """
+        Queues analysis of a document unless it is indexed or already queued.
+        """
+        if not content_hash:
+            return
+        with self._lock:
+            if content_hash in self._pending or self.page_count(content_hash):
+                return
+            self._pending[content_hash] = threading.Event()
+            future = self._pool().submit(analyze_pdf, pdf_path)
+        future.add_done_callback(lambda done: self._store(content_hash, done))
+
+    def _store(self, content_hash: str, future):
+        try:
+            pages = future.result()
+        except Exception as e:
+            print(f"Page Index: analysis failed for {content_hash[:12]}: {e}")
+            pages = None
+
+        if pages is not None:
+            db: Session = SessionLocal()
+            try:
+                db.query(PageMetadata).filter(PageMetadata.content_hash == content_hash).delete()
+                db.add_all(PageMetadata(content_hash=content_hash, **page._asdict()) for page in pages)
+                db.commit()
+                print(f"Page Index: {content_hash[:12]} indexed ({len(pages)} pages, "
+                      f"{sum(p.is_blank for p in pages)} blank, {sum(p.is_color for p in pages)} colour)")
+            except Exception as e:
+                print(f"Page Index: could not store {content_hash[:12]}: {e}")
+            finally:
+                db.close()
+
+        with self._lock:
+            stored = self._pending.pop(content_hash, None)
+        if stored:
+            stored.set()
+
+    def wait(self, content_hash: str, timeout: float = None):
+        """
+        Blocks until a queued analysis for content_hash (if any) is stored.
+        """
+        with self._lock:
+            stored = self._pending.get(content_hash)
+        if stored:
+            stored.wait(timeout)
+
+    def pages(self, content_hash: str) -> list:
+        """
+        PageMetadata rows in page order (detached), or [] if not indexed yet.
+        """
+        if not content_hash:
+            return []
+        db: Session = SessionLocal()
+        try:
+            rows = (
+                db.query(PageMetadata)
+                .filter(PageMetadata.content_hash == content_hash)
+                .order_by(PageMetadata.page_number)
+                .all()
+            )
+            for row in rows:
+                db.expunge(row)
+            return rows
+        finally:
+            db.close()
+
+    def page_count(self, content_hash: str) -> int:
+        """
+        Number of indexed pages, or 0 if the document is not indexed yet.
+        """
+        if not content_hash:
+            return 0
+        db: Session = SessionLocal()
+        try:
+            return db.query(PageMetadata).filter(PageMetadata.content_hash == content_hash).count()
+        finally:
+            db.close()
+
+    def summary(self, content_hash: str) -> dict:
+        """
+        Totals for display: pages, blank pages, colour pages. Empty if not indexed.
+        """
+        pages = self.pages(content_hash)
+        if not pages:
+            return {}
+        return {
+            "pages": len(pages),
+            "blank": sum(1 for p in pages if p.is_blank),
+            "color": sum(1 for p in pages if p.is_color),
+        }
+
+page_index = PageIndex(settings.PAGE_INDEX_WORKERS)
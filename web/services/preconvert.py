@@ -0,0 +1,148 @@
+import concurrent.futures
+import datetime
+import threading
+import time
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from core.printing.page_utils import PageSet
+from core.printing.scheduling import job_sheets
+from web.models.models import Job, UNPAID_STATUSES
+from web.services.conversion_cache import conversion_cache
+from web.services.printer_service import printer_service
+
+class SpeculativeConverter:
+    """
+    Starts converting a document as soon as /upload finishes, while the customer is
+    still choosing settings and paying. The result lands in the conversion cache,
+    so the paid job goes straight to printing, and the real page count is written
+    back to the Job for pricing (checkout waits for it; see ensure()).
+    Work for jobs that are never paid is cancelled (if not started) or evicted.
+    """
+    def __init__(self, workers: int = 1):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preconvert")
+        self._futures = {}  # job_id -> Future
+        self._failed = set()  # job ids whose document could not be converted
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def submit(self, job_id: str, file_path: str, content_hash: str):
+        future = self.executor.submit(self._run, job_id, file_path, content_hash)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id, future))
+
+    def ensure(self, job_id: str, file_path: str, content_hash: str) -> bool:
+        """
+        Makes sure the page count of job_id is on its way: resubmits the job if
+        nothing is running for it (e.g. after a restart). False if its document
+        could not be converted at all.
+        """
+        with self._lock:
+            if job_id in self._failed:
+                return False
+            running = job_id in self._futures
+        if not running:
+            self.submit(job_id, file_path, content_hash)
+        return True
+
+    def _forget(self, job_id: str, future):
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+
+    def wait(self, job_id: str, timeout: float = None):
+        """
+        Blocks until speculative work for job_id (if any) is done.
+        Used by the worker so a paid job never converts the same file twice.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None:
+            return
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            # Failures were already logged; the worker will convert on its own
+            pass
+
+    def _run(self, job_id: str, file_path: str, content_hash: str):
+        started = time.monotonic()
+        entry = conversion_cache.lookup(content_hash)
+        if not entry:
+            pdf_path = printer_service.convert_to_pdf(file_path)
+            if not pdf_path:
+                print(f"Speculative conversion failed for Job #{job_id}")
+                with self._lock:
+                    self._failed.add(job_id)
+                return
+            entry = conversion_cache.store(content_hash, pdf_path, move=pdf_path != file_path)
+
+        db: Session = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job:
+                job.page_count = entry.page_count
+                job.total_pages = entry.page_count
+                if job.status == "payment_pending":
+                    self._reprice(job)
+                db.commit()
+        finally:
+            db.close()
+        print(f"Speculative conversion: Job #{job_id} ready ({entry.page_count} pages, {time.monotonic() - started:.2f}s)")
+
+    def _reprice(self, job: Job):
+        """
+        Re-prices a job checked out before its real page count was known.
+        """
+        pages = len(PageSet.parse(job.page_range, job.total_pages))
+        sheets = job_sheets(pages, job.copies or 1, bool(job.is_duplex))
+        amount = sheets * settings.PRICE_PER_PAGE
+        if sheets != job.sheets or amount != job.total_cost:
+            print(f"Speculative conversion: repriced unpaid Job #{job.id} from {job.sheets} to {sheets} sheets "
+                  f"({job.total_cost} -> {amount})")
+            job.sheets, job.total_cost = sheets, amount
+
+    def sweep_abandoned(self):
+        """
+        Cancels or evicts speculative work for jobs left unpaid past PRECONVERT_ABANDON_MINUTES.
+        Cheap to call often; it only does work every few minutes.
+        """
+        now = time.monotonic()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(minutes=settings.PRECONVERT_ABANDON_MINUTES)
+        # Older jobs were handled by earlier sweeps
+        window_start = cutoff - datetime.timedelta(days=1)
+        db: Session = SessionLocal()
+        try:
+            abandoned = db.query(Job).filter(
+                Job.status.in_(UNPAID_STATUSES),
+                Job.created_at < cutoff,
+                Job.created_at >= window_start,
+            ).all()
+            for job in abandoned:
+                with self._lock:
+                    future = self._futures.get(job.id)
+                if future and future.cancel():
+                    print(f"Speculative conversion cancelled for abandoned Job #{job.id}")
+                    continue
+
+                if not job.content_hash or job.file_path.lower().endswith(".pdf"):
+                    continue
+                # Keep the conversion if any other job still needs it
+                still_needed = db.query(Job).filter(
+                    Job.content_hash == job.content_hash,
+                    Job.id != job.id,
+                    ~Job.status.in_(["completed", "failed"]),
+                    or_(~Job.status.in_(UNPAID_STATUSES), Job.created_at >= cutoff),
+                ).count()
+                if not still_needed and conversion_cache.remove(job.content_hash):
+                    print(f"Speculative conversion evicted for abandoned Job #{job.id}")
+        finally:
+            db.close()
+
+speculative_converter = SpeculativeConverter(settings.PRECONVERT_WORKERS)
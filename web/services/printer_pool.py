@@ -0,0 +1,248 @@
+import threading
+import time
+from core.config import settings
+
+# IPP printer-state values
+PRINTER_STATE_STOPPED = 5
+
+# CUPS job states that still occupy a printer (pending, held, processing)
+ACTIVE_JOB_STATES = (3, 4, 5)
+
+DEFAULT_PPM = 20
+CAPABILITY_ATTRIBUTES = ["sides-supported", "media-supported", "page-ranges-supported",
+                         "color-supported", "printer-resolution-default"]
+
+# IPP resolution units
+UNITS_DPI = 3
+
+class PoolPrinter:
+    """
+    Routing state for one CUPS queue: speed, capabilities and our own backlog on it.
+    """
+    def __init__(self, name: str, ppm: int = DEFAULT_PPM):
+        self.name = name
+        self.ppm = max(1, ppm)
+        self.online = False
+        self.present = False
+        self.duplex = True            # optimistic until CUPS tells us otherwise
+        self.media = set()            # empty = unknown, accept anything
+        self.page_ranges = False      # honours the IPP page-ranges option
+        self.color = True             # assume colour until CUPS says mono
+        self.dpi = None               # native resolution, if reported
+        self.capabilities_loaded = False
+        self.backlog = {}             # cups_job_id -> pages still queued
+        self.duplex_jobs = set()      # cups_job_ids that must stay on a duplex printer
+
+    @property
+    def queued_pages(self) -> int:
+        return sum(self.backlog.values())
+
+    def estimated_minutes(self, extra_pages: int = 0) -> float:
+        return (self.queued_pages + extra_pages) / self.ppm
+
+    def can_print(self, is_duplex: bool, media: str, page_ranges: bool = False) -> bool:
+        if not (self.present and self.online):
+            return False
+        if is_duplex and not self.duplex:
+            return False
+        if page_ranges and not self.page_ranges:
+            return False
+        if media and self.media and media not in self.media:
+            return False
+        return True
+
+    def status(self) -> dict:
+        return {
+            "online": self.online,
+            "ppm": self.ppm,
+            "queued_pages": self.queued_pages,
+            "queued_jobs": len(self.backlog),
+            "duplex": self.duplex,
+            "page_ranges": self.page_ranges,
+        }
+
+def parse_pool(pool_str: str, default_printer: str) -> list:
+    """
+    Parses PRINTER_POOL, e.g. "Canon_LBP122dw:29, HP_M15w:19".
+    The ":ppm" part is optional. An empty setting means a pool of just default_printer.
+    """
+    members = []
+    for part in (pool_str or "").split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, ppm = part.partition(':')
+        try:
+            members.append(PoolPrinter(name.strip(), int(ppm) if ppm.strip() else DEFAULT_PPM))
+        except ValueError:
+            print(f"Printer Pool: ignoring bad entry '{part}'")
+    if not members and default_printer:
+        members.append(PoolPrinter(default_printer))
+    return members
+
+class PrinterPool:
+    """
+    Routes each job to the pool printer with the shortest estimated backlog
+    (queued pages / pages-per-minute) that supports the job's duplex/media needs.
+    Printers that go offline stop receiving work and have their queued jobs moved.
+    """
+    def __init__(self, pool_str: str, default_printer: str, refresh_interval: float = 10.0):
+        self.printers = {p.name: p for p in parse_pool(pool_str, default_printer)}
+        # An unset PRINTER_POOL keeps the old "any printer CUPS knows" fallback
+        self.explicit = bool((pool_str or "").strip())
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, conn, force: bool = False):
+        """
+        Updates online state and backlog from CUPS (one getPrinters + one getJobs call).
+        """
+        if conn is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+
+        printers = conn.getPrinters()
+        active = conn.getJobs(which_jobs="not-completed", requested_attributes=["job-id", "job-state"])
+        went_offline = []
+
+        with self._lock:
+            self._last_refresh = now
+            for printer in self.printers.values():
+                attrs = printers.get(printer.name)
+                was_online = printer.online
+                printer.present = attrs is not None
+                printer.online = bool(
+                    attrs
+                    and attrs.get("printer-state") != PRINTER_STATE_STOPPED
+                    and attrs.get("printer-is-accepting-jobs", True)
+                )
+                if printer.present and not printer.capabilities_loaded:
+                    self._load_capabilities(conn, printer)
+
+                # Forget jobs CUPS has finished with
+                for cups_job_id in list(printer.backlog):
+                    job = active.get(cups_job_id)
+                    if not job or job.get("job-state") not in ACTIVE_JOB_STATES:
+                        del printer.backlog[cups_job_id]
+                        printer.duplex_jobs.discard(cups_job_id)
+
+                if was_online and not printer.online:
+                    went_offline.append(printer)
+
+        for printer in went_offline:
+            self._drain(conn, printer)
+
+    def _load_capabilities(self, conn, printer: PoolPrinter):
+        try:
+            attrs = conn.getPrinterAttributes(printer.name, requested_attributes=CAPABILITY_ATTRIBUTES)
+        except Exception as e:
+            print(f"Printer Pool: could not read capabilities of {printer.name}: {e}")
+            return
+        sides = attrs.get("sides-supported") or []
+        if isinstance(sides, str):
+            sides = [sides]
+        printer.duplex = any(s.startswith("two-sided") for s in sides) if sides else True
+        media = attrs.get("media-supported") or []
+        printer.media = {media} if isinstance(media, str) else set(media)
+        printer.page_ranges = bool(attrs.get("page-ranges-supported", False))
+        printer.color = bool(attrs.get("color-supported", True))
+        resolution = attrs.get("printer-resolution-default")
+        if isinstance(resolution, (tuple, list)) and len(resolution) == 3 and resolution[2] == UNITS_DPI:
+            printer.dpi = max(resolution[0], resolution[1])
+        printer.capabilities_loaded = True
+
+    def _drain(self, conn, printer: PoolPrinter):
+        """
+        Moves every job we queued on an offline printer to the best remaining one.
+        """
+        with self._lock:
+            backlog = list(printer.backlog.items())
+        if not backlog:
+            return
+        print(f"Printer Pool: {printer.name} went offline, draining {len(backlog)} job(s)")
+        for cups_job_id, pages in backlog:
+            is_duplex = cups_job_id in printer.duplex_jobs
+            target = self.select(pages, is_duplex=is_duplex)
+            if not target or target == printer.name:
+                print(f"Printer Pool: no printer available for CUPS job {cups_job_id}, leaving it queued")
+                continue
+            try:
+                conn.moveJob(job_id=cups_job_id, job_printer_uri=f"ipp://localhost/printers/{target}")
+            except Exception as e:
+                print(f"Printer Pool: failed to move CUPS job {cups_job_id}: {e}")
+                continue
+            with self._lock:
+                printer.backlog.pop(cups_job_id, None)
+                printer.duplex_jobs.discard(cups_job_id)
+            self.reserve(target, cups_job_id, pages, is_duplex)
+            print(f"Printer Pool: moved CUPS job {cups_job_id} {printer.name} -> {target}")
+
+    def select(self, pages: int, is_duplex: bool = False, media: str = None, page_ranges: bool = False) -> str:
+        """
+        Returns the name of the printer that would finish this job soonest, or None.
+        page_ranges=True only considers printers that can select pages themselves.
+        """
+        with self._lock:
+            candidates = [p for p in self.printers.values() if p.can_print(is_duplex, media, page_ranges)]
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda p: p.estimated_minutes(pages))
+            return best.name
+
+    def printer_of(self, cups_job_id: int) -> str:
+        """
+        Name of the pool printer a still-queued CUPS job was sent to, or None.
+        """
+        with self._lock:
+            for printer in self.printers.values():
+                if cups_job_id in printer.backlog:
+                    return printer.name
+        return None
+
+    def shortest_backlog(self) -> int:
+        """
+        Pages queued on the least busy online printer (cached state), or None if none is online.
+        """
+        with self._lock:
+            online = [p.queued_pages for p in self.printers.values() if p.present and p.online]
+            return min(online) if online else None
+
+    def supports_page_ranges(self) -> bool:
+        """
+        True if some online printer can take a page-ranges job (from cached state, no CUPS call).
+        """
+        with self._lock:
+            return any(p.present and p.online and p.page_ranges for p in self.printers.values())
+
+    def all_mono(self) -> bool:
+        """
+        True if every online printer is known to be monochrome (cached state).
+        """
+        with self._lock:
+            online = [p for p in self.printers.values() if p.present and p.online]
+            return bool(online) and not any(p.color for p in online)
+
+    def native_dpi(self) -> int:
+        """
+        Highest native resolution reported by an online printer, or None.
+        """
+        with self._lock:
+            dpis = [p.dpi for p in self.printers.values() if p.present and p.online and p.dpi]
+            return max(dpis) if dpis else None
+
+    def reserve(self, printer_name: str, cups_job_id: int, pages: int, is_duplex: bool = False):
+        with self._lock:
+            printer = self.printers.get(printer_name)
+            if printer:
+                printer.backlog[cups_job_id] = pages
+                if is_duplex:
+                    printer.duplex_jobs.add(cups_job_id)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {name: p.status() for name, p in self.printers.items()}
+
+printer_pool = PrinterPool(settings.PRINTER_POOL, settings.PRINTER_NAME, settings.PRINTER_POOL_REFRESH_INTERVAL)
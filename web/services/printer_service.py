@@ -1,10 +1,10 @@
 import os
-import subprocess
 import cups
 import fitz  # PyMuPDF
-import img2pdf
-from PIL import Image
 from core.config import settings
+from web.services.printer_pool import printer_pool
+from web.services.converters import converter_registry
+from core.printing.page_utils import PageSet
 
 class PrinterService:
     def __init__(self):
@@ -15,48 +15,33 @@ class PrinterService:
             self.conn = None 
             
         self.printer_name = settings.PRINTER_NAME
+        self.pool = printer_pool
         self.mock_mode = getattr(settings, "MOCK_PRINTER", False)
 
     def convert_to_pdf(self, input_path: str) -> str:
         """
         Converts generic file types to PDF.
         Returns the path to the converted PDF.
+        The converter is picked by detected type (see web/services/converters.py);
+        only Word documents go through LibreOffice.
         """
-        base, ext = os.path.splitext(input_path)
+        base, _ = os.path.splitext(input_path)
         output_pdf = f"{base}.pdf"
-        ext = ext.lower()
 
         try:
-            if ext == ".pdf":
-                return input_path
-            
-            elif ext in [".jpg", ".jpeg", ".png"]:
-                # Convert Image to PDF
-                with open(output_pdf, "wb") as f:
-                    f.write(img2pdf.convert(input_path))
-                return output_pdf
-            
-            elif ext in [".docx", ".doc", ".txt"]:
-                # Use LibreOffice for doc conversion
-                # --headless --convert-to pdf --outdir <dir> <file>
-                cmd = [
-                    "libreoffice", "--headless", "--convert-to", "pdf",
-                    "--outdir", os.path.dirname(input_path),
-                    input_path
-                ]
-                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                return output_pdf
-            
-            else:
-                raise ValueError(f"Unsupported file type: {ext}")
-                
+            return converter_registry.convert(input_path, output_pdf)
         except Exception as e:
             print(f"Conversion failed: {e}")
             return None
 
-    def print_job(self, file_path: str, job_id: int, copies: int = 1, is_duplex: bool = False, page_range: str = None):
+    def print_job(self, file_path: str, job_id: int, copies: int = 1, is_duplex: bool = False, page_range: str = None, page_ranges: str = None, printer: str = None, slice_path: str = None):
         """
         Sends the PDF to CUPS (or Mocks it).
+        page_range slices the file first. page_ranges (canonical, e.g. "1-5,8") is
+        passed to CUPS as-is when the chosen printer supports it, else sliced here.
+        printer pins the CUPS queue instead of routing through the pool.
+        slice_path is where that fallback slice goes (next to the job's upload, so the
+        storage sweep owns it); without one the slice is deleted once CUPS has it.
         """
         if not os.path.exists(file_path):
             print(f"File not found: {file_path}")
@@ -68,13 +53,14 @@ class PrinterService:
 
         # 2. Mock Mode
         if self.mock_mode:
-            print(f" [MOCK PRINT] File: {to_print_path} | Copies: {copies} | Duplex: {is_duplex}")
+            print(f" [MOCK PRINT] File: {to_print_path} | Copies: {copies} | Duplex: {is_duplex} | Pages: {page_ranges or 'all'}")
             return 123456 # Fake Job ID
 
         # 3. Real CUPS Mode
+        media = "iso_a4_210x297mm" # Default to A4
         options = {
             "copies": str(copies),
-            "media": "iso_a4_210x297mm", # Default to A4
+            "media": media,
             # "fit-to-page": "True"
         }
 
@@ -85,12 +71,33 @@ class PrinterService:
 
         job_title = f"PrintBot_Job_{job_id}"
 
+        temp_slice = None
         try:
-            # Check if printer exists
-            printers = self.conn.getPrinters()
-            printer_target = self.printer_name
-            
-            if printer_target not in printers:
+            # Route to the pool printer with the shortest backlog
+            self.pool.refresh(self.conn)
+            printer_target = printer
+            if page_ranges:
+                pages = len(PageSet.parse(page_ranges, self.count_pages(to_print_path))) * copies
+                if not printer_target:
+                    printer_target = self.pool.select(pages, is_duplex=is_duplex, media=media, page_ranges=True)
+                    if printer_target:
+                        options["page-ranges"] = page_ranges
+                if "page-ranges" not in options:
+                    # No printer can select pages itself right now: rewrite the PDF after all
+                    # Never next to to_print_path: that is usually the shared conversion-cache PDF
+                    if not slice_path:
+                        temp_slice = slice_path = os.path.join(settings.UPLOAD_DIR, f"{job_id}_sliced.pdf")
+                    to_print_path = self.apply_page_range(to_print_path, page_ranges, slice_path)
+            else:
+                pages = self.count_pages(to_print_path) * copies
+
+            if not printer_target:
+                printer_target = self.pool.select(pages, is_duplex=is_duplex, media=media)
+
+            if not printer_target:
+                printers = self.conn.getPrinters()
+                if self.pool.explicit:
+                    raise Exception(f"No online pool printer can take this job. Pool: {self.pool.status()}")
                 print(f"Printer {self.printer_name} not found. Available: {list(printers.keys())}")
                 if printers:
                     printer_target = list(printers.keys())[0] # Fallback
@@ -98,41 +105,116 @@ class PrinterService:
                     raise Exception("No printers found in CUPS.")
 
             print_job_id = self.conn.printFile(printer_target, to_print_path, job_title, options)
+            self.pool.reserve(printer_target, print_job_id, pages, is_duplex)
             print(f"Sent to CUPS ({printer_target}). Job ID: {print_job_id}")
             return print_job_id
         except Exception as e:
             print(f"Printing failed: {e}")
             return None
+        finally:
+            # CUPS keeps its own copy of a submitted file
+            if temp_slice and os.path.exists(temp_slice):
+                os.remove(temp_slice)
+
+    def iter_chunks(self, file_path: str, selection: PageSet, chunk_pages: int, output_prefix: str):
+        """
+        Yields (chunk_path, pages) for consecutive chunk_pages-page pieces of the selection.
+        Each piece is only written when the caller asks for it, so the first one can be
+        printing while the rest are cut, and only one chunk is ever held in memory.
+        """
+        with fitz.open(file_path) as src:
+            for seq, chunk in enumerate(selection.split(chunk_pages)):
+                out = fitz.open()
+                for start, end in chunk.intervals:
+                    out.insert_pdf(src, from_page=start, to_page=end - 1)
+                chunk_path = f"{output_prefix}_part{seq + 1}.pdf"
+                out.save(chunk_path, garbage=3, deflate=True)
+                out.close()
+                yield chunk_path, len(chunk)
+
+    def optimize_pdf(self, file_path: str, output_path: str, dpi: int, grayscale: bool = False) -> tuple:
+        """
+        Rewrites a PDF for the printer: images above `dpi` are downsampled to it
+        (and made grayscale if asked), duplicate objects are merged and streams
+        compressed. Returns (path, bytes_before, bytes_after); path is the original
+        file when the rewrite would not be smaller.
+        """
+        size_before = os.path.getsize(file_path)
+        with fitz.open(file_path) as doc:
+            if hasattr(doc, "rewrite_images"):
+                # Leave images that are only slightly above target alone
+                doc.rewrite_images(dpi_threshold=int(dpi * 1.1), dpi_target=dpi, quality=85, set_to_gray=grayscale)
+            else:
+                print("PDF optimize: this PyMuPDF cannot rewrite images, only compacting")
+            doc.save(output_path, garbage=4, deflate=True, clean=True)
+        size_after = os.path.getsize(output_path)
+        if size_after >= size_before:
+            os.remove(output_path)
+            return file_path, size_before, size_before
+        return output_path, size_before, size_after
+
+    def count_pages(self, file_path: str) -> int:
+        try:
+            with fitz.open(file_path) as doc:
+                return doc.page_count
+        except Exception as e:
+            print(f"Page count error: {e}")
+            return 1
+
+    def merge_for_batch(self, parts: list, output_path: str, is_duplex: bool, separator: bool = True) -> str:
+        """
+        Merges several small jobs into one spool file.
+        parts: list of (pdf_path, page_ranges, copies, label); page_ranges None means
+        every page. Copies are laid out back to back
+        inside the file so every customer's pages come out together; with duplex,
+        each job starts on a fresh sheet. An optional banner page separates jobs.
+        """
+        merged = fitz.open()
+        for index, (pdf_path, page_ranges, copies, label) in enumerate(parts):
+            with fitz.open(pdf_path) as src:
+                selection = PageSet.parse(page_ranges, src.page_count)
+                if separator and index > 0:
+                    self._pad_to_sheet(merged, is_duplex)
+                    banner = merged.new_page()
+                    banner.insert_text((72, 96), label, fontsize=20)
+                for _ in range(max(copies, 1)):
+                    self._pad_to_sheet(merged, is_duplex)
+                    for start, end in selection.intervals:
+                        merged.insert_pdf(src, from_page=start, to_page=end - 1)
+        merged.save(output_path, garbage=3, deflate=True)
+        merged.close()
+        return output_path
+
+    def _pad_to_sheet(self, doc, is_duplex: bool):
+        # On duplex an odd page count would put the next page on the back of this sheet
+        if is_duplex and doc.page_count % 2:
+            doc.new_page()
 
-    def apply_page_range(self, file_path: str, range_str: str) -> str:
+    def apply_page_range(self, file_path: str, range_str: str, output_path: str = None) -> str:
         """
         Creates a temporary PDF containing only the requested pages.
+        Written to output_path if given, else next to the source as *_sliced.pdf.
         """
         if not range_str or not range_str.strip():
             return file_path
 
-        from core.printing.page_utils import parse_page_range
-        
         try:
             doc = fitz.open(file_path)
-            total_pages = doc.page_count
-            pages_to_keep = parse_page_range(range_str, total_pages)
+            pages_to_keep = PageSet.parse(range_str, doc.page_count)
             
             # If requesting all pages, just return original
-            if len(pages_to_keep) == total_pages:
-                 # Check if it's actually sequential 0..N-1
-                if pages_to_keep == list(range(total_pages)):
-                    doc.close()
-                    return file_path
+            if pages_to_keep.is_all():
+                doc.close()
+                return file_path
             
-            output_filename = f"{os.path.splitext(file_path)[0]}_sliced.pdf"
+            output_filename = output_path or f"{os.path.splitext(file_path)[0]}_sliced.pdf"
             
             # Select only the pages we want (destructive operation on this object)
-            doc.select(pages_to_keep)
+            doc.select(list(pages_to_keep))
             doc.save(output_filename)
             doc.close()
                 
-            print(f"Created sliced PDF: {output_filename} with pages {pages_to_keep}")
+            print(f"Created sliced PDF: {output_filename} with pages {pages_to_keep.to_cups_ranges()}")
             return output_filename
             
         except Exception as e:
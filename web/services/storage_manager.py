@@ -0,0 +1,244 @@
+import datetime
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from typing import List, NamedTuple
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from core.printing.images import IMAGE_SET_EXT, read_image_set
+from web.models.models import Job, UNPAID_STATUSES
+
+class ArtifactGroup(NamedTuple):
+    key: str            # upload uuid every artifact of the job is named after
+    job_id: str         # None for files no job refers to
+    status: str         # job status, "orphan" without a job
+    last_used: float    # newest mtime among the files
+    size: int
+    paths: List[str]
+
+def plan_evictions(groups: List[ArtifactGroup], now: float, used_bytes: int, quota_bytes: int,
+                   retention: dict, min_age: float) -> List[ArtifactGroup]:
+    """
+    Groups to delete: every group past its status's retention (seconds), then
+    the least recently used of the rest until used_bytes fits quota_bytes
+    (0 = no quota). Groups younger than min_age, or whose status has no
+    retention (paid, processing, printing), are never picked.
+    """
+    evict, spare = [], []
+    for group in groups:
+        if group.status not in retention:
+            continue
+        age = now - group.last_used
+        if age > retention[group.status]:
+            evict.append(group)
+            used_bytes -= group.size
+        elif age > min_age:
+            spare.append(group)
+
+    if quota_bytes > 0:
+        for group in sorted(spare, key=lambda g: g.last_used):
+            if used_bytes <= quota_bytes:
+                break
+            evict.append(group)
+            used_bytes -= group.size
+    return evict
+
+def _dir_bytes(path: str, exclude: str = None) -> int:
+    """
+    Total size of the files under path, leaving out the subtree exclude.
+    """
+    exclude = os.path.abspath(exclude) if exclude else None
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude]
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _mb(size: int) -> float:
+    return round(size / 1024 / 1024, 1)
+
+class StorageManager:
+    """
+    Keeps uploads/ within STORAGE_QUOTA_MB. Every artifact of a job (original,
+    converted, optimized, sliced, chunk and batch PDFs) is named after the
+    upload's uuid, so one scan of the directory groups them per job; photo sets
+    add their member photos. Groups are deleted once their job has been
+    completed, failed or left unpaid for longer than its retention, and least
+    recently used first when the quota is still exceeded.
+
+    Runs on its own thread at the lowest CPU priority, every
+    STORAGE_SWEEP_INTERVAL seconds. The conversion cache, thumbnails and
+    resumable upload sessions (partial_dir) keep their own limits and are not
+    counted against the quota. Each sweep also measures usage for the admin
+    dashboard, so a dashboard load never scans the disk or the jobs table.
+    """
+    def __init__(self, upload_dir: str, quota_bytes: int, interval: float, partial_dir: str = None):
+        self.upload_dir = upload_dir
+        self.partial_dir = partial_dir
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.last_sweep = {}
+        self._usage = {}  # measured by the last sweep
+        self._lock = threading.Lock()
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def retention(self) -> dict:
+        unpaid = settings.STORAGE_RETAIN_UNPAID_HOURS * 3600
+        retention = {status: unpaid for status in UNPAID_STATUSES}
+        retention["orphan"] = unpaid
+        retention["completed"] = settings.STORAGE_RETAIN_COMPLETED_HOURS * 3600
+        retention["failed"] = settings.STORAGE_RETAIN_FAILED_HOURS * 3600
+        return retention
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name="storage-manager", daemon=True)
+        thread.start()
+
+    def _run(self):
+        try:
+            # Linux nice values are per thread: only the sweeper is deprioritised
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            # First sweep right away, so the dashboard has figures shortly after startup
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Storage Manager Error: {e}")
+                traceback.print_exc()
+            time.sleep(self.interval)
+
+    def collect(self) -> List[ArtifactGroup]:
+        """
+        Groups the files in upload_dir by job. Files not named after an upload
+        uuid are left alone.
+        """
+        files = {}  # key -> [(path, size, mtime)]
+        for entry in os.scandir(self.upload_dir):
+            if not entry.is_file():
+                continue
+            try:
+                uuid.UUID(entry.name[:36])
+                stat = entry.stat()
+            except (ValueError, OSError):
+                continue
+            files.setdefault(entry.name[:36], []).append((entry.path, stat.st_size, stat.st_mtime))
+        if not files:
+            return []
+
+        db: Session = SessionLocal()
+        try:
+            jobs = db.query(Job.id, Job.status, Job.file_path).all()
+        finally:
+            db.close()
+
+        groups = []
+        for job_id, status, file_path in jobs:
+            key = os.path.basename(file_path or "")[:36]
+            if key not in files:
+                continue
+            members = files.pop(key)
+            if file_path.endswith(IMAGE_SET_EXT):
+                try:
+                    for photo in read_image_set(file_path):
+                        members += files.pop(os.path.basename(photo)[:36], [])
+                except OSError:
+                    pass
+            groups.append(self._group(key, job_id, status, members))
+        # Whatever is left belongs to no job: failed uploads, half-written files
+        groups += [self._group(key, None, "orphan", members) for key, members in files.items()]
+        return groups
+
+    def _group(self, key: str, job_id: str, status: str, members: list) -> ArtifactGroup:
+        return ArtifactGroup(
+            key=key,
+            job_id=job_id,
+            status=status,
+            last_used=max(mtime for _, _, mtime in members),
+            size=sum(size for _, size, _ in members),
+            paths=[path for path, _, _ in members],
+        )
+
+    def sweep(self) -> dict:
+        with self._lock:
+            started = time.monotonic()
+            groups = self.collect()
+            used = _dir_bytes(self.upload_dir, exclude=self.partial_dir)
+            evict = plan_evictions(
+                groups, time.time(), used, self.quota_bytes, self.retention(),
+                settings.STORAGE_MIN_AGE_MINUTES * 60,
+            )
+
+            freed = removed = 0
+            kept = {group.key: group for group in groups}
+            db: Session = SessionLocal()
+            try:
+                for group in evict:
+                    if group.job_id:
+                        # The job may have been paid since collect(); then it is no longer ours to delete
+                        job = db.query(Job).filter(Job.id == group.job_id).first()
+                        if job and job.status not in self.retention():
+                            continue
+                    for path in group.paths:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                    freed += group.size
+                    removed += 1
+                    kept.pop(group.key, None)
+            finally:
+                db.close()
+
+            self.last_sweep = {
+                "at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+                "removed": removed,
+                "freed_mb": round(freed / 1024 / 1024, 1),
+                "seconds": round(time.monotonic() - started, 2),
+            }
+            self._usage = self._measure(kept.values(), used - freed)
+            if removed:
+                print(f"Storage: removed {removed} job(s), freed {freed / 1024 / 1024:.1f} MB "
+                      f"({(used - freed) / 1024 / 1024:.1f} MB in {self.upload_dir})")
+            return self.last_sweep
+
+    def _measure(self, groups, used: int) -> dict:
+        by_status = {}
+        for group in groups:
+            by_status[group.status] = by_status.get(group.status, 0) + group.size
+        return {
+            "uploads_mb": _mb(used),
+            "quota_mb": _mb(self.quota_bytes),
+            "quota_percent": round(100 * used / self.quota_bytes) if self.quota_bytes else None,
+            "by_status_mb": {status: _mb(size) for status, size in sorted(by_status.items())},
+            "partial_uploads_mb": _mb(_dir_bytes(self.partial_dir)) if self.partial_dir else 0.0,
+            "conversion_cache_mb": _mb(_dir_bytes(settings.CONVERSION_CACHE_DIR)),
+            "thumbnails_mb": _mb(_dir_bytes(settings.THUMBNAIL_CACHE_DIR)),
+            "measured_at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+        }
+
+    def usage(self) -> dict:
+        """
+        Disk usage for the admin dashboard, in MB, as of the last sweep (empty
+        until the first one). Only free disk space is read live (one statvfs).
+        """
+        usage = dict(self._usage)
+        usage["disk_free_mb"] = _mb(shutil.disk_usage(self.upload_dir).free)
+        usage["last_sweep"] = self.last_sweep
+        return usage
+
+storage_manager = StorageManager(
+    settings.UPLOAD_DIR,
+    settings.STORAGE_QUOTA_MB * 1024 * 1024,
+    settings.STORAGE_SWEEP_INTERVAL,
+    settings.UPLOAD_SESSION_DIR,
+)
@@ -0,0 +1,131 @@
+import concurrent.futures
+import itertools
+import os
+import queue
+import threading
+from core.config import settings
+from core.printing.thumbnails import render_thumbnail
+from core.process_pool import spawn_pool
+
+class ThumbnailService:
+    """
+    Page previews rendered on demand and kept in a size-capped LRU disk cache.
+    Files are named after the document's content hash, so a cached thumbnail can
+    never go stale and its name doubles as a strong ETag.
+
+    Requests wait in a priority queue ordered by page number, so the first pages
+    of a document (the ones on screen) are rendered first. THUMBNAIL_WORKERS
+    dispatcher threads each hand one render at a time to a process pool.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int, workers: int = 1):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = max(1, workers)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.queue = queue.PriorityQueue()
+        self._seq = itertools.count()  # FIFO among equal pages
+        self._inflight = {}            # path -> Future, so concurrent requests share a render
+        self._lock = threading.Lock()
+        self._executor = None
+        self._started = False
+
+        self._size = None              # bytes on disk, scanned on first write
+        self._evict_lock = threading.Lock()
+
+    def path_for(self, content_hash: str, page: int, width: int) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}_{page}_{width}.jpg")
+
+    def etag(self, content_hash: str, page: int, width: int) -> str:
+        return f'"{content_hash[:32]}-{page}-{width}"'
+
+    def _start(self):
+        # Caller holds self._lock
+        if self._started:
+            return
+        self._executor = spawn_pool(self.workers)
+        for i in range(self.workers):
+            threading.Thread(target=self._dispatch, name=f"thumbnail-{i}", daemon=True).start()
+        self._started = True
+
+    def request(self, content_hash: str, pdf_path: str, page: int, width: int) -> concurrent.futures.Future:
+        """
+        Returns a Future for the JPEG bytes of page (0-based). Cache hits are
+        resolved immediately and bumped in the LRU order. Bytes rather than a
+        path, so eviction can never pull a file out from under a response.
+        A cache hit reads the disk: call it from a thread, not the event loop.
+        """
+        path = self.path_for(content_hash, page, width)
+        future = concurrent.futures.Future()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime is the LRU clock
+            future.set_result(data)
+            return future
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            if path in self._inflight:
+                return self._inflight[path]
+            self._inflight[path] = future
+            self._start()
+            self.queue.put((page, next(self._seq), pdf_path, width, path))
+        return future
+
+    def _dispatch(self):
+        while True:
+            page, _, pdf_path, width, path = self.queue.get()
+            with self._lock:
+                future = self._inflight.get(path)
+            try:
+                # Render to a temp name so readers never see a half-written file
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                self._executor.submit(render_thumbnail, pdf_path, page, width, tmp_path).result()
+                with open(tmp_path, "rb") as f:
+                    data = f.read()
+                os.replace(tmp_path, path)
+                self._account(len(data))
+                if future:
+                    future.set_result(data)
+            except Exception as e:
+                print(f"Thumbnail Error: page {page} of {pdf_path}: {e}")
+                if future:
+                    future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(path, None)
+
+    def _account(self, added_bytes: int):
+        """
+        Tracks cache size and evicts least recently used thumbnails over max_bytes.
+        """
+        with self._evict_lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+            else:
+                self._size += added_bytes
+            if self._size <= self.max_bytes:
+                return
+
+            entries = sorted(
+                (entry.stat().st_mtime, entry.path, entry.stat().st_size)
+                for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith(".jpg")
+            )
+            self._size = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self._size -= size
+                except FileNotFoundError:
+                    pass
+
+thumbnail_service = ThumbnailService(
+    settings.THUMBNAIL_CACHE_DIR,
+    settings.THUMBNAIL_CACHE_MAX_MB * 1024 * 1024,
+    settings.THUMBNAIL_WORKERS,
+)
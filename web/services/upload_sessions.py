@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from core.config import settings
+
+class UploadSessionStore:
+    """
+    Resumable uploads (tus-style). A session is a partial file plus a small JSON
+    sidecar in UPLOAD_SESSION_DIR; the current offset is simply the size of the
+    partial file, so it survives restarts. Chunks are appended at that offset,
+    so a dropped connection only costs the chunk that was in flight.
+
+    The running sha256 of each session is kept in memory and fed as chunks
+    arrive, so finishing an upload never re-reads it. After a restart (or a
+    write that failed halfway) it is rebuilt from disk once, at finish.
+    """
+    def __init__(self, session_dir: str, ttl_hours: float):
+        self.session_dir = session_dir
+        self.ttl_seconds = ttl_hours * 3600
+        os.makedirs(session_dir, exist_ok=True)
+        self._hashers = {}   # session_id -> (offset hashed so far, sha256), under that session's lock
+        self._session_locks = {}  # session_id -> Lock, so uploads never wait on each other
+        self._lock = threading.Lock()  # guards _session_locks
+        self._last_sweep = 0.0
+
+    def _paths(self, session_id: str):
+        # Session ids come from URLs; only ever accept our own uuid4 hex
+        try:
+            session_id = uuid.UUID(hex=session_id).hex
+        except ValueError:
+            return None, None
+        base = os.path.join(self.session_dir, session_id)
+        return f"{base}.part", f"{base}.json"
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def _forget(self, session_id: str):
+        self._hashers.pop(session_id, None)
+        with self._lock:
+            self._session_locks.pop(session_id, None)
+
+    def create(self, filename: str, content_type: str, length: int) -> str:
+        session_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(session_id)
+        open(part_path, "wb").close()
+        with open(meta_path, "w") as f:
+            json.dump({"filename": filename, "content_type": content_type, "length": length}, f)
+        self._hashers[session_id] = (0, hashlib.sha256())
+        return session_id
+
+    def get(self, session_id: str) -> dict:
+        """
+        Session metadata with its current offset, or None if unknown or expired.
+        """
+        part_path, meta_path = self._paths(session_id)
+        if not part_path:
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta["offset"] = os.path.getsize(part_path)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def append(self, session_id: str, offset: int, data: bytes) -> int:
+        """
+        Appends data at offset and returns the new offset. Returns None when
+        offset is not the current end of the file (a stale or concurrent
+        client); nothing is written then. Only appends to the same session
+        wait for each other.
+        """
+        part_path, _ = self._paths(session_id)
+        with self._session_lock(session_id):
+            if os.path.getsize(part_path) != offset:
+                return None
+            with open(part_path, "ab") as f:
+                f.write(data)
+            hashed = self._hashers.get(session_id)
+            if hashed and hashed[0] == offset:
+                hashed[1].update(data)
+                self._hashers[session_id] = (offset + len(data), hashed[1])
+            else:
+                self._hashers.pop(session_id, None)
+            return offset + len(data)
+
+    def finish(self, session_id: str, dest_path: str) -> str:
+        """
+        Moves a completed upload to dest_path and returns its sha256.
+        """
+        part_path, meta_path = self._paths(session_id)
+        with self._session_lock(session_id):
+            size = os.path.getsize(part_path)
+            hashed = self._hashers.pop(session_id, None)
+            if hashed and hashed[0] == size:
+                content_hash = hashed[1].hexdigest()
+            else:
+                hasher = hashlib.sha256()
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        hasher.update(chunk)
+                content_hash = hasher.hexdigest()
+            os.replace(part_path, dest_path)
+            os.remove(meta_path)
+        self._forget(session_id)
+        return content_hash
+
+    def discard(self, session_id: str):
+        with self._session_lock(session_id):
+            for path in self._paths(session_id):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        self._forget(session_id)
+
+    def sweep_stale(self):
+        """
+        Deletes sessions nobody has written to for UPLOAD_SESSION_TTL_HOURS.
+        Called from the worker loop; scans UPLOAD_SESSION_DIR at most once per 5 minutes.
+        """
+        now = time.time()
+        if now - self._last_sweep < 300:
+            return
+        self._last_sweep = now
+
+        for entry in os.scandir(self.session_dir):
+            if not entry.name.endswith(".part"):
+                continue
+            try:
+                idle = now - entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if idle > self.ttl_seconds:
+                session_id = entry.name[:-len(".part")]
+                self.discard(session_id)
+                print(f"Upload Sessions: discarded stale session {session_id} ({idle / 3600:.1f}h idle)")
+
+upload_sessions = UploadSessionStore(settings.UPLOAD_SESSION_DIR, settings.UPLOAD_SESSION_TTL_HOURS)